@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from game.animation import AnimationHandler
 import traceback
+from typing import Optional
 
 import tcod
 
@@ -8,6 +9,10 @@ import game.color as color
 import game.exceptions as exceptions
 import game.setup_game as setup_game
 import game.input_handlers as input_handlers
+from game.event_queue import EventQueue
+from game.profiler import profiler
+from game.spectator import SpectatorServer, parse_address
+from game.terminal import TerminalContext
 
 import game.game_config as cfg
 
@@ -23,21 +28,32 @@ def main() -> None:
     screen_height = cfg.SCREEN_HEIGHT
     screen_width = cfg.SCREEN_WIDTH
 
-    tileset = tcod.tileset.load_tilesheet(*cfg.TILESET)
-
     # Start new game, don't waste time with menu.
     # handler: input_handlers.BaseEventHandler = input_handlers.MainGameEventHandler(
     #     setup_game.new_game())
 
-    with tcod.context.new(
-        columns=screen_width,
-        rows=screen_height,
-        tileset=tileset,
-        title=cfg.TITLE,
-        vsync=True,
-    ) as context:
+    if cfg.TERMINAL:
+        context = TerminalContext()
+        get_events = context.events
+    else:
+        context = tcod.context.new(
+            columns=screen_width,
+            rows=screen_height,
+            tileset=tcod.tileset.load_tilesheet(*cfg.TILESET),
+            title=cfg.TITLE,
+            vsync=True,
+        )
+        get_events = tcod.event.get
+
+    spectators: Optional[SpectatorServer] = None
+    if cfg.SPECTATOR_ADDRESS:
+        spectators = SpectatorServer(parse_address(cfg.SPECTATOR_ADDRESS))
+        spectators.start()
+
+    with context:
         root_console = tcod.Console(screen_width, screen_height, order="F")
         animation_handler = AnimationHandler(console=root_console)
+        event_queue = EventQueue()
         handler: input_handlers.BaseEventHandler = setup_game.MainMenu(
             animation_handler=animation_handler)
         try:
@@ -45,14 +61,25 @@ def main() -> None:
                 root_console.clear()
                 # The rendering order is wrong. I will need to create a renderering class
                 # that can handle z-indexing so consoles can be sorted then drawn.
-                animation_handler.draw_frame()
-                handler.on_render(console=root_console)
-                context.present(root_console)
+                with profiler.phase("animation"):
+                    animation_handler.draw_frame()
+                with profiler.phase("render"):
+                    handler.on_render(console=root_console)
+                profiler.render(root_console)
+                with profiler.phase("present"):
+                    context.present(root_console)
+                    if spectators:
+                        spectators.publish(root_console)
+                profiler.next_frame()
 
                 try:
-                    for event in tcod.event.get():
-                        context.convert_event(event)
-                        handler = handler.handle_events(event)
+                    with profiler.phase("events"):
+                        event_queue.extend(get_events())
+                        for event in event_queue.drain():
+                            if profiler.handle_event(event):
+                                continue
+                            context.convert_event(event)
+                            handler = handler.handle_events(event)
                 except Exception:  # Handle exceptions in game.
                     traceback.print_exc()  # Print error to stderr.
                     # Then print the error to the message log.
@@ -68,6 +95,15 @@ def main() -> None:
         except BaseException:  # Save on any other unexpected exception.
             save_game(handler, "savegame.sav")
             raise
+        finally:
+            if isinstance(handler, input_handlers.EventHandler):
+                handler.engine.message_log.flush()
+                if handler.engine.recorder:
+                    handler.engine.recorder.save(cfg.RECORDING_FILE)
+            if profiler.enabled:
+                profiler.dump(cfg.PROFILER_TRACE_FILE)
+            if spectators:
+                spectators.close()
 
 
 if __name__ == "__main__":
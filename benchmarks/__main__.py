@@ -0,0 +1,57 @@
+"""Run the benchmark suite from the repository root.
+
+    python -m benchmarks [-k FILTER] [--output FILE] [--compare BASELINE]
+"""
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.suite import cases, compare, environment, run_case
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-k", "--filter", default="", help="Only run cases whose name contains this text.")
+    parser.add_argument(
+        "--repeat", type=int, help="Override the number of repeats of every case.")
+    parser.add_argument(
+        "--output", default="bench_results.json", help="Where to write the results.")
+    parser.add_argument(
+        "--compare", metavar="BASELINE", help="Results file to check for regressions against.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="Allowed slowdown of the median before a case is a regression.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        if os.path.abspath(args.compare) == os.path.abspath(args.output):
+            parser.error("--output would overwrite the --compare baseline, pick another file.")
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for case in cases():
+        if args.filter not in case.name:
+            continue
+        stats = run_case(case, repeat=args.repeat)
+        results[case.name] = stats
+        print(f"{case.name:<55} {stats['median'] * 1000:>10.3f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(
+                f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""Headless benchmark cases for the game's hot paths.
+
+Every case builds its state from a fixed seed so that runs are comparable,
+and only the code under test is inside the timed region.
+"""
+from __future__ import annotations
+
+import copy
+import io
+import itertools
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np  # type: ignore
+import tcod
+
+import game.entity_factories as entity_factories
+import game.exceptions as exceptions
+import game.game_config as cfg
+import game.setup_game as setup_game
+from game.camera import Camera
+from game.commands import AutoExploreCommand
+from game.engine import Engine
+from game.environment import GameEnv, NUMBER_OF_ACTIONS
+from game.floor_cache import FloorCache
+from game.vector_environment import VectorEnv
+from game.game_map import GameMap, GameWorld
+from game.procgen import build_dungeon, generate_dungeon
+from game.spectator import delta_message
+from game.terminal import TerminalPresenter
+
+SEED = 1234
+
+
+Timed = Callable[[], object]
+
+
+class Case(NamedTuple):
+    name: str
+    # Returns the function to time, called once per repeat.  Cases whose
+    # function changes their state return (function, reset) instead, reset is
+    # called untimed before each repeat to put the state back.
+    setup: Callable[[], Union[Timed, Tuple[Timed, Timed]]]
+    repeat: int
+
+
+def new_engine(
+    map_width: int = cfg.MAP_WIDTH, map_height: int = cfg.MAP_HEIGHT, max_rooms: int = 30,
+    seed: int = SEED,
+) -> Engine:
+    """Return an engine with a generated floor and an unkillable player."""
+    player = copy.deepcopy(entity_factories.player)
+    player.fighter.max_hp = player.fighter.hp = 10 ** 9
+    camera = Camera(width=cfg.CAMERA_WIDTH, height=cfg.CAMERA_HEIGHT)
+    engine = Engine(player=player, camera=camera, seed=seed)
+    engine.game_world = GameWorld(
+        engine=engine,
+        max_rooms=max_rooms,
+        room_min_size=6,
+        room_max_size=20,
+        map_width=map_width,
+        map_height=map_height,
+        camera=camera,
+    )
+    engine.game_world.generate_floor()
+    engine.update_fov()
+    return engine
+
+
+def floor_tiles(game_map: GameMap) -> List[Tuple[int, int]]:
+    xs, ys = np.nonzero(game_map.tiles["walkable"])
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def populate(engine: Engine, number_of_enemies: int) -> None:
+    """Replace the monsters on the current floor with `number_of_enemies` orcs."""
+    game_map = engine.game_map
+    for actor in list(game_map.actors):
+        if actor is not engine.player:
+            game_map.remove_entity(actor)
+    free = [xy for xy in floor_tiles(game_map)
+            if xy != (engine.player.x, engine.player.y)]
+    for x, y in random.sample(free, min(number_of_enemies, len(free))):
+        entity_factories.orc.spawn(game_map, x, y)
+
+
+def bench_generate_dungeon(map_width: int, map_height: int, max_rooms: int) -> Callable[[], object]:
+    engine = new_engine()
+
+    def run() -> GameMap:
+        return generate_dungeon(
+            max_rooms=max_rooms,
+            room_min_size=6,
+            room_max_size=20,
+            map_width=map_width,
+            map_height=map_height,
+            engine=engine,
+            camera=engine.camera,
+        )
+    return run
+
+
+def bench_cached_floor() -> Callable[[], object]:
+    """Load the current floor from a floor cache and build it again."""
+    engine = new_engine()
+    cache = FloorCache(tempfile.mkdtemp())
+    key = cache.key(SEED, 1, engine.game_world.parameters)
+    cache.store(key, engine.game_map.tiles, engine.game_map.plan)
+
+    def run() -> GameMap:
+        tiles, plan = cache.load(key)
+        return build_dungeon(tiles, plan, engine=engine, camera=engine.camera)
+    return run
+
+
+def bench_hostile_ai(number_of_enemies: int) -> Tuple[Timed, Timed]:
+    engine = new_engine()
+    populate(engine, number_of_enemies)
+    # Let every enemy see the player so they all path towards them.
+    engine.game_map.visible[:] = True
+    enemies = [actor for actor in engine.game_map.actors
+               if actor is not engine.player]
+    # The enemies walk towards the player, each repeat starts them from here.
+    start = [(enemy.x, enemy.y) for enemy in enemies]
+
+    def run() -> None:
+        for enemy in enemies:
+            try:
+                enemy.ai.perform()
+            except exceptions.Impossible:
+                pass
+
+    def reset() -> None:
+        for enemy, (x, y) in zip(enemies, start):
+            enemy.place(x, y)
+            enemy.ai.path = []
+    return run, reset
+
+
+def bench_update_fov() -> Callable[[], object]:
+    return new_engine().update_fov
+
+
+def bench_map_render() -> Callable[[], object]:
+    engine = new_engine()
+    populate(engine, 100)
+    console = tcod.Console(cfg.SCREEN_WIDTH, cfg.SCREEN_HEIGHT, order="F")
+    return lambda: engine.game_map.render(console)
+
+
+def bench_engine_render() -> Callable[[], object]:
+    engine = new_engine()
+    console = tcod.Console(cfg.SCREEN_WIDTH, cfg.SCREEN_HEIGHT, order="F")
+    return lambda: engine.render(console)
+
+
+def bench_entity_spawn(count: int) -> Tuple[Timed, Timed]:
+    engine = new_engine()
+    game_map = engine.game_map
+    tiles = floor_tiles(game_map)
+    entities = set(game_map.entities)
+    queue = list(game_map.scheduler.queue)
+
+    def run() -> None:
+        for i in range(count):
+            entity_factories.orc.spawn(game_map, *tiles[i % len(tiles)])
+
+    def reset() -> None:
+        """Remove the orcs spawned by the last repeat."""
+        for entity in list(game_map.entities):
+            if entity not in entities:
+                game_map.remove_entity(entity)
+        game_map.scheduler.queue[:] = queue
+    return run, reset
+
+
+def bench_auto_explore(map_width: int, map_height: int, max_rooms: int) -> Callable[[], object]:
+    """Explore a whole floor with no monsters or items in the way."""
+    def run() -> int:
+        return AutoExploreCommand().run(engine)
+
+    engine = new_engine(map_width, map_height, max_rooms)
+    populate(engine, 0)
+    for item in list(engine.game_map.items):
+        engine.game_map.remove_entity(item)
+    return run
+
+
+def bench_long_paths(map_width: int, map_height: int, max_rooms: int, hierarchical: bool) -> Callable[[], object]:
+    """Path an enemy to 50 far away tiles, with or without the room graph."""
+    def run() -> None:
+        for x, y in destinations:
+            enemy.ai.get_path_to(x, y)
+
+    engine = new_engine(map_width, map_height, max_rooms)
+    populate(engine, 1)
+    game_map = engine.game_map
+    if not hierarchical:
+        game_map.room_graph = None
+    enemy = next(actor for actor in game_map.actors if actor is not engine.player)
+    destinations = [
+        (x, y) for x, y in floor_tiles(game_map)
+        if max(abs(x - enemy.x), abs(y - enemy.y)) > cfg.HIERARCHICAL_PATH_DISTANCE
+    ]
+    destinations = random.sample(destinations, min(50, len(destinations)))
+    return run
+
+
+def bench_environment_steps(steps: int) -> Callable[[], object]:
+    """Step the bot environment with random actions, starting over on death."""
+    env = GameEnv()
+    env.reset(seed=SEED)
+    rng = random.Random(SEED)
+
+    def run() -> None:
+        for _ in range(steps):
+            done = env.step(rng.randrange(NUMBER_OF_ACTIONS))[2]
+            if done:
+                env.reset(seed=SEED)
+    return run
+
+
+def bench_vector_environment_step(num_envs: int) -> Callable[[], object]:
+    """Step a batch of games in this process with random actions."""
+    env = VectorEnv(num_envs)
+    env.reset(seed=SEED)
+    rng = np.random.default_rng(SEED)
+    return lambda: env.step(rng.integers(0, NUMBER_OF_ACTIONS, num_envs))
+
+
+def stepping_frames() -> List[tcod.Console]:
+    """Return the frames of the player taking a step and stepping back."""
+    engine = new_engine()
+    player = engine.player
+    step = next(
+        (dx, dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+        if engine.game_map.tiles["walkable"][player.x + dx, player.y + dy])
+    consoles = []
+    for dx, dy in (step, (-step[0], -step[1])):
+        player.move(dx, dy)
+        engine.update_fov()
+        console = tcod.Console(cfg.SCREEN_WIDTH, cfg.SCREEN_HEIGHT, order="F")
+        engine.render(console)
+        consoles.append(console)
+    return consoles
+
+
+def bench_terminal_present() -> Callable[[], object]:
+    """Present frames of the player stepping back and forth to the terminal."""
+    consoles = stepping_frames()
+    presenter = TerminalPresenter(io.BytesIO())
+    presenter.present(consoles[-1])
+    presenter.present(consoles[-1])
+    if presenter.bytes_written:
+        raise RuntimeError(f"An unchanged frame wrote {presenter.bytes_written} bytes.")
+    frames = itertools.cycle(consoles)
+    return lambda: presenter.present(next(frames))
+
+
+def bench_spectator_delta() -> Callable[[], object]:
+    """Encode the change of the player taking a step for spectators."""
+    first, second = (
+        console.tiles_rgb.tobytes(order="F") for console in stepping_frames())
+    shape = (cfg.SCREEN_WIDTH, cfg.SCREEN_HEIGHT)
+    return lambda: delta_message(first, second, shape)
+
+
+def bench_save_load() -> Callable[[], object]:
+    engine = new_engine()
+    populate(engine, 100)
+    handle, filename = tempfile.mkstemp(suffix=".sav")
+    os.close(handle)
+
+    def run() -> Engine:
+        try:
+            engine.save_as(filename)
+            return setup_game.load_game(filename)
+        finally:
+            os.remove(filename)
+    return run
+
+
+def cases() -> Iterator[Case]:
+    for map_width, map_height in ((80, 40), (160, 80), (320, 160)):
+        for max_rooms in (30, 100):
+            yield Case(
+                f"procgen.generate_dungeon[{map_width}x{map_height},rooms={max_rooms}]",
+                lambda w=map_width, h=map_height, r=max_rooms: bench_generate_dungeon(
+                    w, h, r),
+                repeat=10,
+            )
+    yield Case("floor_cache.load+build_dungeon", bench_cached_floor, repeat=20)
+    for number_of_enemies in (10, 100, 1000):
+        yield Case(
+            f"ai.HostileEnemy.perform[{number_of_enemies}]",
+            lambda n=number_of_enemies: bench_hostile_ai(n),
+            repeat=3 if number_of_enemies >= 1000 else 20,
+        )
+    yield Case("engine.update_fov", bench_update_fov, repeat=200)
+    yield Case("game_map.render", bench_map_render, repeat=200)
+    yield Case("engine.render", bench_engine_render, repeat=100)
+    yield Case("terminal.TerminalPresenter.present", bench_terminal_present, repeat=100)
+    yield Case("spectator.delta_message", bench_spectator_delta, repeat=100)
+    yield Case("entity.spawn[100]", lambda: bench_entity_spawn(100), repeat=20)
+    yield Case("engine.save_as+load_game", bench_save_load, repeat=10)
+    yield Case("environment.GameEnv.step[1000]", lambda: bench_environment_steps(1000), repeat=5)
+    yield Case("vector_environment.VectorEnv.step[64]",
+               lambda: bench_vector_environment_step(64), repeat=20)
+    for map_width, map_height, max_rooms in ((160, 80, 30), (320, 160, 120)):
+        yield Case(
+            f"commands.AutoExploreCommand[{map_width}x{map_height}]",
+            lambda w=map_width, h=map_height, r=max_rooms: bench_auto_explore(
+                w, h, r),
+            repeat=1,
+        )
+    for hierarchical in (False, True):
+        yield Case(
+            f"ai.get_path_to[320x160,{'rooms' if hierarchical else 'grid'}]",
+            lambda h=hierarchical: bench_long_paths(320, 160, 120, h),
+            repeat=10,
+        )
+
+
+def run_case(case: Case, seed: int = SEED, repeat: Optional[int] = None) -> Dict[str, float]:
+    """Time a case and return statistics in seconds per call."""
+    random.seed(seed)
+    function = case.setup()
+    reset: Optional[Timed] = None
+    if isinstance(function, tuple):
+        function, reset = function
+    timings = []
+    for _ in range(repeat or case.repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "repeat": len(timings),
+    }
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "tcod": tcod.__version__,
+        "machine": platform.machine(),
+        "seed": str(SEED),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[Tuple[str, float, float]]:
+    """Return (name, baseline, current) median times of cases slower than
+    `tolerance` (a fraction) relative to the baseline."""
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median"]
+        after = stats["median"]
+        if after > before * (1 + tolerance):
+            regressions.append((name, before, after))
+    return regressions
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-import random
-from typing import List, Optional, Tuple, TYPE_CHECKING
+from typing import List, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 import tcod
 
 from game.actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
+import game.game_config as cfg
+from game.render_order import RenderOrder
+from game.status_effects import Effect
 
 if TYPE_CHECKING:
     from game.entity import Actor
@@ -16,28 +18,79 @@ class BaseAI(Action):
     def perform(self) -> None:
         raise NotImplementedError()
 
-    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
-        """Compute and return a path to the target position.
+    def perform_coarse(self) -> bool:
+        """A cheaper turn for actors which are away from the player.
 
-        If there is no valid path then returns an empty list.
+        Returns True if the actor is idle, so it can be updated less often.
         """
+        self.perform()
+        return False
+
+    @property
+    def confused(self) -> bool:
+        return self.engine.status_effects.has(self.entity, Effect.CONFUSED)
+
+    def stumble(self) -> None:
+        """Move or attack in a random direction, as a confused actor does.
+
+        Its possible the actor will just bump into the wall, wasting a turn.
+        """
+        direction_x, direction_y = self.engine.rng.stream("ai").choice(
+            [
+                (-1, -1),  # Northwest
+                (0, -1),  # North
+                (1, -1),  # Northeast
+                (-1, 0),  # West
+                (1, 0),  # East
+                (-1, 1),  # Southwest
+                (0, 1),  # South
+                (1, 1),  # Southeast
+            ]
+        )
+        return BumpAction(self.entity, direction_x, direction_y,).perform()
+
+    def path_cost(self, area: Tuple[slice, slice]) -> np.ndarray:
+        """Return the cost of walking over each tile in `area` of the map."""
+        gamemap = self.entity.gamemap
         # Copy the walkable array.
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
+        cost = np.array(gamemap.tiles["walkable"][area], dtype=np.int8, order="F")
+
+        # Every actor blocks movement, they are all in the render index.
+        actors = gamemap.render_index.buckets[RenderOrder.ACTOR]
+        n = actors.count
+        xs = actors.xs[:n] - area[0].start
+        ys = actors.ys[:n] - area[1].start
+        inside = (xs >= 0) & (xs < cost.shape[0]) & (ys >= 0) & (ys < cost.shape[1])
+        xs, ys = xs[inside], ys[inside]
+        # Only add to the cost of positions which aren't blocked by walls.
+        xs, ys = xs[cost[xs, ys] != 0], ys[cost[xs, ys] != 0]
+        # Add to the cost of a blocked position.
+        # A lower number means more enemies will crowd behind each other in
+        # hallways.  A higher number means enemies will take longer paths in
+        # order to surround the player.
+        cost[xs, ys] += 10
+        return cost
 
-        for entity in self.entity.gamemap.entities:
-            # Check that an enitiy blocks movement and the cost isn't zero (blocking.)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position.
-                # A lower number means more enemies will crowd behind each other in
-                # hallways.  A higher number means enemies will take longer paths in
-                # order to surround the player.
-                cost[entity.x, entity.y] += 10
+    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
+        """Compute and return a path to the target position.
 
+        If there is no valid path then returns an empty list.
+        """
+        gamemap = self.entity.gamemap
+        start = (self.entity.x, self.entity.y)
+        distance = max(abs(dest_x - start[0]), abs(dest_y - start[1]))
+        if gamemap.room_graph is not None and distance > cfg.HIERARCHICAL_PATH_DISTANCE:
+            # Plan over the rooms first so only the tiles along the way are searched.
+            path = gamemap.room_graph.find_path(self.path_cost, start, (dest_x, dest_y))
+            if path is not None:
+                return path
+
+        cost = self.path_cost((slice(0, gamemap.width), slice(0, gamemap.height)))
         # Create a graph from the cost array and pass that graph to a new pathfinder.
         graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
         pathfinder = tcod.path.Pathfinder(graph)
 
-        pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
+        pathfinder.add_root(start)  # Start position.
 
         # Compute the path to the destination and remove the starting point.
         path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[
@@ -53,6 +106,9 @@ class HostileEnemy(BaseAI):
         self.path: List[Tuple[int, int]] = []
 
     def perform(self) -> None:
+        if self.confused:
+            return self.stumble()
+
         target = self.engine.player
         dx = target.x - self.entity.x
         dy = target.y - self.entity.y
@@ -72,45 +128,15 @@ class HostileEnemy(BaseAI):
 
         return WaitAction(self.entity).perform()
 
-
-class ConfusedEnemy(BaseAI):
-    """
-    A confused enemy will stumble around aimlessly for a given number of turns, then revert back to its previous AI.
-    If an actor occupies a tile it is randomly moving into, it will attack.
-    """
-
-    def __init__(
-        self, entity: Actor, previous_ai: Optional[BaseAI], turns_remaining: int
-    ):
-        super().__init__(entity)
-
-        self.previous_ai = previous_ai
-        self.turns_remaining = turns_remaining
-
-    def perform(self) -> None:
-        # Revert the AI back to the original state if the effect has run its course.
-        if self.turns_remaining <= 0:
-            self.engine.message_log.add_message(
-                f"The {self.entity.name} is no longer confused."
-            )
-            self.entity.ai = self.previous_ai
-        else:
-            # Pick a random direction
-            direction_x, direction_y = random.choice(
-                [
-                    (-1, -1),  # Northwest
-                    (0, -1),  # North
-                    (1, -1),  # Northeast
-                    (-1, 0),  # West
-                    (1, 0),  # East
-                    (-1, 1),  # Southwest
-                    (0, 1),  # South
-                    (1, 1),  # Southeast
-                ]
-            )
-
-            self.turns_remaining -= 1
-
-            # The actor will either try to move or attack in the chosen random direction.
-            # Its possible the actor will just bump into the wall, wasting a turn.
-            return BumpAction(self.entity, direction_x, direction_y,).perform()
+    def perform_coarse(self) -> bool:
+        if self.confused:
+            self.stumble()
+            return False
+        # Too far away to see the player, so only follow the last known path.
+        if not self.path:
+            return True
+        dest_x, dest_y = self.path.pop(0)
+        MovementAction(
+            self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
+        ).perform()
+        return False
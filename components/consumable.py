@@ -4,15 +4,17 @@ from typing import Optional, TYPE_CHECKING
 
 import game.actions as actions
 import game.color as color
-import components.ai
 import components.inventory
 from components.base_component import BaseComponent
+from components.fighter import StatModifier
 from game.exceptions import Impossible
+from game.game_config import AI_COMBAT_NOISE_RADIUS
 from game.input_handlers import (
     ActionOrHandler,
     AreaRangedAttackHandler,
     SingleRangedAttackHandler,
 )
+from game.status_effects import Effect
 
 if TYPE_CHECKING:
     from game.entity import Actor, Item
@@ -68,9 +70,8 @@ class ConfusionConsumable(Consumable):
             f"The eyes of the {target.name} look vacant, as it starts to stumble around!",
             color.status_effect_applied,
         )
-        target.ai = components.ai.ConfusedEnemy(
-            entity=target, previous_ai=target.ai, turns_remaining=self.number_of_turns,
-        )
+        self.engine.status_effects.apply(
+            target, Effect.CONFUSED, self.number_of_turns)
         self.consume()
 
 
@@ -95,8 +96,11 @@ class FireballDamageConsumable(Consumable):
         if not self.engine.game_map.visible[target_xy]:
             raise Impossible("You cannot target an area that you cannot see.")
 
+        self.engine.game_map.activity.make_noise(
+            *target_xy, self.radius + AI_COMBAT_NOISE_RADIUS)
+
         targets_hit = False
-        for actor in self.engine.game_map.actors:
+        for actor in list(self.engine.game_map.actors):
             if actor.distance(*target_xy) <= self.radius:
                 self.engine.message_log.add_message(
                     f"The {actor.name} is engulfed in a fiery explosion, taking {self.damage} damage!"
@@ -109,6 +113,44 @@ class FireballDamageConsumable(Consumable):
         self.consume()
 
 
+class PoisonCloudConsumable(Consumable):
+    def __init__(self, damage: int, number_of_turns: int, radius: int):
+        self.damage = damage
+        self.number_of_turns = number_of_turns
+        self.radius = radius
+
+    def get_action(self, consumer: Actor) -> AreaRangedAttackHandler:
+        self.engine.message_log.add_message(
+            "Select a target location.", color.needs_target
+        )
+        return AreaRangedAttackHandler(
+            self.engine,
+            radius=self.radius,
+            callback=lambda xy: actions.ItemAction(consumer, self.parent, xy),
+        )
+
+    def activate(self, action: actions.ItemAction) -> None:
+        target_xy = action.target_xy
+
+        if not self.engine.game_map.visible[target_xy]:
+            raise Impossible("You cannot target an area that you cannot see.")
+
+        targets = [
+            actor for actor in self.engine.game_map.actors
+            if actor.distance(*target_xy) <= self.radius
+        ]
+        if not targets:
+            raise Impossible("There are no targets in the radius.")
+
+        self.engine.message_log.add_message(
+            f"A cloud of poison gas engulfs {len(targets)} creature{'s' if len(targets) > 1 else ''}!",
+            color.status_effect_applied,
+        )
+        self.engine.status_effects.apply_area(
+            targets, Effect.POISONED, self.number_of_turns, self.damage)
+        self.consume()
+
+
 class HealingConsumable(Consumable):
     def __init__(self, amount: int):
         self.amount = amount
@@ -127,6 +169,26 @@ class HealingConsumable(Consumable):
             raise Impossible(f"Your health is already full.")
 
 
+class StatBoostConsumable(Consumable):
+    """Raises the consumer's stats for a number of turns, as a timed `StatModifier`."""
+
+    def __init__(self, name: str, number_of_turns: int, power: int = 0, defense: int = 0):
+        self.name = name
+        self.number_of_turns = number_of_turns
+        self.power = power
+        self.defense = defense
+
+    def activate(self, action: actions.ItemAction) -> None:
+        consumer = action.entity
+        consumer.fighter.add_modifier(StatModifier(
+            self.name, power=self.power, defense=self.defense, turns=self.number_of_turns))
+        self.engine.message_log.add_message(
+            f"You consume the {self.parent.name}, and gain {self.name} for {self.number_of_turns} turns!",
+            color.status_effect_applied,
+        )
+        self.consume()
+
+
 class LightningDamageConsumable(Consumable):
     def __init__(self, damage: int, maximum_range: int):
         self.damage = damage
@@ -60,6 +60,7 @@ class Equipment(BaseComponent):
             self.unequip_from_slot(slot, add_message)
 
         setattr(self, slot, item)
+        self.parent.fighter.invalidate_stats()
 
         if add_message:
             self.equip_message(item.name)
@@ -71,6 +72,7 @@ class Equipment(BaseComponent):
             self.unequip_message(current_item.name)
 
         setattr(self, slot, None)
+        self.parent.fighter.invalidate_stats()
 
     def toggle_equip(self, equippable_item: Item, add_message: bool = True) -> None:
         if (
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
 import game.color as color
+import game.game_config as cfg
 from components.base_component import BaseComponent
 from game.render_order import RenderOrder
 
@@ -10,14 +11,36 @@ if TYPE_CHECKING:
     from game.entity import Actor
 
 
+class StatModifier:
+    """
+    A bonus (or with negative values a penalty) to a fighter's stats.
+
+    Modifiers with a number of turns are timed buffs and debuffs, they run out
+    after their owner has taken that many turns.
+    """
+
+    def __init__(self, name: str, power: int = 0, defense: int = 0, turns: Optional[int] = None):
+        self.name = name
+        self.power = power
+        self.defense = defense
+        self.turns = turns
+
+
 class Fighter(BaseComponent):
     parent: Actor
 
     def __init__(self, hp: int, base_defense: int, base_power: int):
         self.max_hp = hp
         self._hp = hp
-        self.base_defense = base_defense
-        self.base_power = base_power
+        self._base_defense = base_defense
+        self._base_power = base_power
+        self.modifiers: List[StatModifier] = []
+        # Turns rested since the last HP regenerated, see `regenerate`.
+        self.regeneration = 0
+        # Cached totals of the base stats, equipment and modifiers.
+        self._defense = 0
+        self._power = 0
+        self._stats_dirty = True
 
     @property
     def hp(self) -> int:
@@ -29,46 +52,125 @@ class Fighter(BaseComponent):
         if self._hp == 0 and self.parent.ai:
             self.die()
 
+    @property
+    def base_defense(self) -> int:
+        return self._base_defense
+
+    @base_defense.setter
+    def base_defense(self, value: int) -> None:
+        self._base_defense = value
+        self._stats_dirty = True
+
+    @property
+    def base_power(self) -> int:
+        return self._base_power
+
+    @base_power.setter
+    def base_power(self, value: int) -> None:
+        self._base_power = value
+        self._stats_dirty = True
+
     @property
     def defense(self) -> int:
-        return self.base_defense + self.defense_bonus
+        if self._stats_dirty:
+            self.update_stats()
+        return self._defense
 
     @property
     def power(self) -> int:
-        return self.base_power + self.power_bonus
+        if self._stats_dirty:
+            self.update_stats()
+        return self._power
 
     @property
     def defense_bonus(self) -> int:
-        if self.parent.equipment:
-            return self.parent.equipment.defense_bonus
-        else:
-            return 0
+        return self.defense - self.base_defense
 
     @property
     def power_bonus(self) -> int:
-        if self.parent.equipment:
-            return self.parent.equipment.power_bonus
-        else:
-            return 0
+        return self.power - self.base_power
+
+    def invalidate_stats(self) -> None:
+        """Note that equipment or modifiers changed, stats are totalled again on next use."""
+        self._stats_dirty = True
+
+    def update_stats(self) -> None:
+        defense = self.base_defense
+        power = self.base_power
+        equipment = self.parent.equipment
+        if equipment:
+            defense += equipment.defense_bonus
+            power += equipment.power_bonus
+        for modifier in self.modifiers:
+            defense += modifier.defense
+            power += modifier.power
+        self._defense = defense
+        self._power = power
+        self._stats_dirty = False
+
+    def add_modifier(self, modifier: StatModifier) -> None:
+        self.modifiers.append(modifier)
+        self._stats_dirty = True
+
+    def remove_modifier(self, modifier: StatModifier) -> None:
+        self.modifiers.remove(modifier)
+        self._stats_dirty = True
+
+    def tick_modifiers(self) -> None:
+        """Count down timed modifiers by one turn, removing the ones that ran out."""
+        if not self.modifiers:
+            return
+        expired = []
+        for modifier in self.modifiers:
+            if modifier.turns is not None:
+                modifier.turns -= 1
+                if modifier.turns <= 0:
+                    expired.append(modifier)
+        for modifier in expired:
+            self.remove_modifier(modifier)
+            if self.parent is self.engine.player:
+                self.engine.message_log.add_message(
+                    f"Your {modifier.name} wears off.")
 
     def die(self) -> None:
-        if self.engine.player is self.parent:
+        actor = self.parent
+        gamemap = self.gamemap
+        if self.engine.player is actor:
             death_message = "You died!"
             death_message_color = color.player_die
         else:
-            death_message = f"{self.parent.name} is dead!"
+            death_message = f"{actor.name} is dead!"
             death_message_color = color.enemy_die
 
-        self.parent.char = "%"
-        self.parent.color = (191, 0, 0)
-        self.parent.blocks_movement = False
-        self.parent.ai = None
-        self.parent.name = f"remains of {self.parent.name}"
-        self.parent.render_order = RenderOrder.CORPSE
+        self.engine.status_effects.purge(actor)
+        actor.ai = None
+        if self.engine.player is actor:
+            # The player stays on the map for the game over screen.
+            actor.char = "%"
+            actor.color = color.corpse
+            actor.blocks_movement = False
+            actor.name = f"remains of {actor.name}"
+            actor.render_order = RenderOrder.CORPSE
+            gamemap.entity_changed(actor)
+        else:
+            # Monsters leave only a mark on the map, the actor is recycled.
+            gamemap.add_corpse(actor.x, actor.y, f"remains of {actor.name}")
+            gamemap.remove_entity(actor)
+            self.engine.actor_pool.release(actor)
 
         self.engine.message_log.add_message(death_message, death_message_color)
 
-        self.engine.player.level.add_xp(self.parent.level.xp_given)
+        self.engine.player.level.add_xp(actor.level.xp_given)
+
+    def regenerate(self) -> None:
+        """Count a turn of rest towards healing, 1 HP every `cfg.REGENERATION_TURNS` turns."""
+        if self._hp >= self.max_hp:
+            self.regeneration = 0
+            return
+        self.regeneration += 1
+        if self.regeneration >= cfg.REGENERATION_TURNS:
+            self.regeneration = 0
+            self.hp += 1
 
     def heal(self, amount: int) -> int:
         if self.hp == self.max_hp:
@@ -86,4 +188,5 @@ class Fighter(BaseComponent):
         return amount_recovered
 
     def take_damage(self, amount: int) -> None:
+        self.gamemap.activity.wake(self.parent)
         self.hp -= amount
@@ -4,6 +4,7 @@ from typing import Optional, Tuple, TYPE_CHECKING
 
 import game.color as color
 import game.exceptions as exceptions
+from game.game_config import AI_COMBAT_NOISE_RADIUS
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -48,7 +49,7 @@ class PickupAction(Action):
                 if len(inventory.items) >= inventory.capacity:
                     raise exceptions.Impossible("Your inventory is full.")
 
-                self.engine.game_map.entities.remove(item)
+                self.engine.game_map.remove_entity(item)
                 item.parent = self.entity.inventory
                 inventory.items.append(item)
 
@@ -103,6 +104,13 @@ class WaitAction(Action):
         pass
 
 
+class RestAction(WaitAction):
+    """Wait and recover, see `Fighter.regenerate`."""
+
+    def perform(self) -> None:
+        self.entity.fighter.regenerate()
+
+
 class TakeStairsAction(Action):
     def perform(self) -> None:
         """
@@ -151,6 +159,9 @@ class MeleeAction(ActionWithDirection):
 
         damage = self.entity.fighter.power - target.fighter.defense
 
+        self.engine.game_map.activity.make_noise(
+            target.x, target.y, AI_COMBAT_NOISE_RADIUS)
+
         attack_desc = f"{self.entity.name.capitalize()} attacks {target.name}"
         if self.entity is self.engine.player:
             attack_color = color.player_atk
@@ -161,7 +172,7 @@ class MeleeAction(ActionWithDirection):
             self.engine.message_log.add_message(
                 f"{attack_desc} for {damage} hit points.", attack_color
             )
-            target.fighter.hp -= damage
+            target.fighter.take_damage(damage)
         else:
             self.engine.message_log.add_message(
                 f"{attack_desc} but does no damage.", attack_color
@@ -183,7 +194,7 @@ class MovementAction(ActionWithDirection):
             raise exceptions.Impossible("That way is blocked.")
 
         self.entity.move(self.dx, self.dy)
-        if self.entity is self.engine.player:
+        if self.entity is self.engine.player and self.engine.camera_follows_player:
             self.engine.camera.center_on(dest_x, dest_y)
 
 
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from enum import auto, Enum
+from typing import Dict, Tuple, TYPE_CHECKING
+
+import game.game_config as cfg
+
+if TYPE_CHECKING:
+    from game.entity import Actor
+    from game.game_map import GameMap
+
+Chunk = Tuple[int, int]
+
+
+class Activity(Enum):
+    FULL = auto()  # Near the player, runs its full AI.
+    COARSE = auto()  # Mid range, runs a cheap update.
+    DORMANT = auto()  # Far away, out of the turn order until woken.
+
+
+class ActivityManager:
+    """
+    Decides how much work each actor on a map gets per turn, based on how far
+    away from the player it is.
+
+    Dormant actors are taken out of the turn order and kept in buckets by map
+    chunk.  They are woken when the player comes within
+    `cfg.AI_DORMANT_CHUNK_RADIUS` chunks of them, when they hear a noise, or
+    when they take damage.  Waking only happens when the player changes chunk,
+    so a turn costs nothing per dormant actor.
+    """
+
+    def __init__(self, game_map: GameMap):
+        self.game_map = game_map
+        # Ordered sets, so actors always wake in the same order.
+        self.buckets: Dict[Chunk, Dict[Actor, None]] = {}
+        self.dormant: Dict[Actor, Chunk] = {}
+        self.player_chunk: Chunk = (-1, -1)
+
+    @staticmethod
+    def chunk_of(x: int, y: int) -> Chunk:
+        return x // cfg.AI_CHUNK_SIZE, y // cfg.AI_CHUNK_SIZE
+
+    def activity_of(self, actor: Actor) -> Activity:
+        """Return how much work `actor` should get this turn."""
+        player = self.game_map.engine.player
+        chunk_x, chunk_y = self.chunk_of(actor.x, actor.y)
+        if (
+            max(abs(chunk_x - self.player_chunk[0]),
+                abs(chunk_y - self.player_chunk[1]))
+            > cfg.AI_DORMANT_CHUNK_RADIUS
+        ):
+            return Activity.DORMANT
+        if max(abs(actor.x - player.x), abs(actor.y - player.y)) > cfg.AI_FULL_RADIUS:
+            return Activity.COARSE
+        return Activity.FULL
+
+    def sleep(self, actor: Actor) -> None:
+        """Take `actor` out of the turn order until something wakes it."""
+        chunk = self.chunk_of(actor.x, actor.y)
+        self.dormant[actor] = chunk
+        self.buckets.setdefault(chunk, {})[actor] = None
+
+    def wake(self, actor: Actor) -> None:
+        """Put a dormant actor back into the turn order, does nothing if it is awake."""
+        chunk = self.dormant.pop(actor, None)
+        if chunk is None:
+            return
+        bucket = self.buckets[chunk]
+        del bucket[actor]
+        if not bucket:
+            del self.buckets[chunk]
+        self.game_map.scheduler.schedule(actor, actor.action_delay)
+
+    def wake_chunk(self, chunk: Chunk) -> None:
+        for actor in list(self.buckets.get(chunk, ())):
+            self.wake(actor)
+
+    def make_noise(self, x: int, y: int, radius: int) -> None:
+        """Wake every dormant actor within `radius` tiles of a noise."""
+        if not self.dormant:
+            return
+        x1, y1 = self.chunk_of(x - radius, y - radius)
+        x2, y2 = self.chunk_of(x + radius, y + radius)
+        for chunk_x in range(x1, x2 + 1):
+            for chunk_y in range(y1, y2 + 1):
+                for actor in list(self.buckets.get((chunk_x, chunk_y), ())):
+                    if max(abs(actor.x - x), abs(actor.y - y)) <= radius:
+                        self.wake(actor)
+
+    def update(self, x: int, y: int) -> None:
+        """Track the player at (x, y), waking actors once they are close enough."""
+        chunk = self.chunk_of(x, y)
+        if chunk == self.player_chunk:
+            return
+        self.player_chunk = chunk
+        if not self.dormant:
+            return
+        radius = cfg.AI_DORMANT_CHUNK_RADIUS
+        for chunk_x in range(chunk[0] - radius, chunk[0] + radius + 1):
+            for chunk_y in range(chunk[1] - radius, chunk[1] + radius + 1):
+                self.wake_chunk((chunk_x, chunk_y))
@@ -0,0 +1,66 @@
+"""Dead actors kept for reuse by later spawns of the same kind."""
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+import game.game_config as cfg
+
+if TYPE_CHECKING:
+    from game.entity import Actor
+
+# The components of an actor which are reused along with it.
+REUSED_COMPONENTS = ("equipment", "fighter", "inventory", "level")
+
+
+class ActorPool:
+    """
+    Holds dead actors by name, up to `capacity` of them.
+
+    `acquire` resets a pooled actor to the state of a prototype in place of
+    spawning a new copy, so long fights don't keep allocating actors.
+    """
+
+    def __init__(self, capacity: int = cfg.ACTOR_POOL_CAPACITY):
+        self.capacity = capacity
+        self.size = 0
+        self.free: Dict[str, List[Actor]] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pooled actors are only worth keeping while the game runs.
+        state = self.__dict__.copy()
+        state["size"] = 0
+        state["free"] = {}
+        return state
+
+    def release(self, actor: Actor) -> None:
+        """Take a dead actor, which must no longer be on any map."""
+        actor.generation += 1  # Outdated turns of this actor are skipped.
+        if self.size < self.capacity:
+            self.free.setdefault(actor.name, []).append(actor)
+            self.size += 1
+
+    def acquire(self, prototype: Actor) -> Optional[Actor]:
+        """Return a pooled actor reset to a copy of `prototype`, if there is one."""
+        free = self.free.get(prototype.name)
+        if not free:
+            return None
+        actor = free.pop()
+        self.size -= 1
+        # Copy the prototype into the existing objects instead of new ones.
+        memo: Dict[int, Any] = {id(prototype): actor}
+        for name in REUSED_COMPONENTS:
+            memo[id(getattr(prototype, name))] = getattr(actor, name)
+        for name in REUSED_COMPONENTS:
+            component = getattr(actor, name)
+            component.__dict__.clear()
+            component.__dict__.update(copy.deepcopy(
+                getattr(prototype, name).__dict__, memo))
+        generation = actor.generation
+        actor.__dict__.clear()
+        actor.__dict__.update(copy.deepcopy(prototype.__dict__, memo))
+        actor.generation = generation
+        return actor
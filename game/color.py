@@ -22,6 +22,7 @@ descend = (0x9F, 0x3F, 0xFF)
 
 player_die = (0xFF, 0x30, 0x30)
 enemy_die = (0xFF, 0xA0, 0x30)
+corpse = (0xBF, 0x0, 0x0)
 
 invalid = (0xFF, 0xFF, 0x00)
 impossible = (0x80, 0x80, 0x80)
@@ -0,0 +1,250 @@
+"""Commands which take many turns in a row, like resting or travelling.
+
+The turns of a command run back to back without rendering, and the command
+stops as soon as something interrupts it.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Set, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+import tcod
+
+from game.actions import Action, MovementAction, RestAction
+import game.color as color
+import game.exceptions as exceptions
+import game.game_config as cfg
+from game.render_order import RenderOrder
+
+if TYPE_CHECKING:
+    from game.engine import Engine
+    from game.entity import Actor
+
+# The 8 directions, used to find which neighbouring tiles are open.
+NEIGHBOURS = ((-1, -1), (0, -1), (1, -1), (-1, 0),
+              (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+def visible_enemies(engine: Engine) -> Set[Actor]:
+    """Return the enemies the player can see, only the FOV window is searched."""
+    game_map = engine.game_map
+    return {
+        actor for actor in game_map.render_index.visible_in(
+            RenderOrder.ACTOR, game_map.visible, game_map.fov_window)
+        if actor is not engine.player
+    }
+
+
+def item_underfoot(engine: Engine) -> bool:
+    player = engine.player
+    return engine.game_map.render_index.any_at(RenderOrder.ITEM, player.x, player.y)
+
+
+class MultiTurnCommand:
+    """Base class for commands which perform actions until they are done or interrupted."""
+
+    def __init__(self) -> None:
+        self.last_hp = 0
+
+    def start(self, engine: Engine) -> Optional[str]:
+        """Called before the first turn.  Returns a reason if the command can't start."""
+        if visible_enemies(engine):
+            return "You can't do that with enemies in view."
+        return None
+
+    def next_action(self, engine: Engine) -> Optional[Action]:
+        """Return the action for the next turn, or None when the command is done."""
+        raise NotImplementedError()
+
+    def interrupted(self, engine: Engine) -> Optional[str]:
+        """Checked after every turn.  Returns a reason to stop early, if there is one.
+
+        An empty reason stops the command without a message.
+        """
+        player = engine.player
+        if player.fighter.hp < self.last_hp:
+            return "You are hurt!"
+        self.last_hp = player.fighter.hp
+        enemies = visible_enemies(engine)
+        if enemies:
+            return f"You see a {min(enemy.name for enemy in enemies)}."
+        return None
+
+    def run(self, engine: Engine) -> int:
+        """Run this command to completion and return the number of turns it took."""
+        player = engine.player
+        reason = self.start(engine)
+        if reason:
+            engine.message_log.add_message(reason, color.impossible)
+            return 0
+
+        self.last_hp = player.fighter.hp
+        turns = 0
+        engine.camera_follows_player = False
+        try:
+            while turns < cfg.MULTI_TURN_LIMIT:
+                action = self.next_action(engine)
+                if action is None:
+                    break
+                try:
+                    engine.perform_turn(action)
+                except exceptions.Impossible as exc:
+                    engine.message_log.add_message(
+                        exc.args[0], color.impossible)
+                    break
+                turns += 1
+                if not player.is_alive or player.level.requires_level_up:
+                    break
+                reason = self.interrupted(engine)
+                if reason is not None:
+                    if reason:
+                        engine.message_log.add_message(
+                            reason, color.impossible)
+                    break
+        finally:
+            engine.camera_follows_player = True
+            engine.camera.center_on(player.x, player.y)
+        return turns
+
+
+class RestCommand(MultiTurnCommand):
+    """Wait until fully healed, for up to `cfg.REST_TURN_LIMIT` turns.
+
+    Resting is the only way to regenerate HP, 1 HP every
+    `cfg.REGENERATION_TURNS` turns of rest, see `Fighter.regenerate`.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.turns_left = cfg.REST_TURN_LIMIT
+
+    def next_action(self, engine: Engine) -> Optional[Action]:
+        fighter = engine.player.fighter
+        if fighter.hp >= fighter.max_hp or self.turns_left <= 0:
+            return None
+        self.turns_left -= 1
+        return RestAction(engine.player)
+
+    def start(self, engine: Engine) -> Optional[str]:
+        fighter = engine.player.fighter
+        if fighter.hp >= fighter.max_hp:
+            return "You are already fully rested."
+        return super().start(engine)
+
+
+class RunCommand(MultiTurnCommand):
+    """Move in one direction until something interesting happens."""
+
+    def __init__(self, dx: int, dy: int):
+        super().__init__()
+        self.dx = dx
+        self.dy = dy
+        self.openings = 0
+
+    @staticmethod
+    def open_neighbours(engine: Engine) -> int:
+        """Return a bitmask of the walkable tiles around the player."""
+        game_map = engine.game_map
+        player = engine.player
+        mask = 0
+        for i, (dx, dy) in enumerate(NEIGHBOURS):
+            x, y = player.x + dx, player.y + dy
+            if game_map.in_bounds(x, y) and game_map.tiles["walkable"][x, y]:
+                mask |= 1 << i
+        return mask
+
+    def start(self, engine: Engine) -> Optional[str]:
+        self.openings = self.open_neighbours(engine)
+        return super().start(engine)
+
+    def next_action(self, engine: Engine) -> Optional[Action]:
+        return MovementAction(engine.player, self.dx, self.dy)
+
+    def interrupted(self, engine: Engine) -> Optional[str]:
+        reason = super().interrupted(engine)
+        if reason is not None:
+            return reason
+        game_map = engine.game_map
+        player = engine.player
+        if (player.x, player.y) == game_map.downstairs_location:
+            return "You find a staircase."
+        if item_underfoot(engine):
+            return "There is something here."
+        # Stop where the walls around us change, like at junctions and doorways.
+        openings = self.open_neighbours(engine)
+        if bin(openings).count("1") != bin(self.openings).count("1"):
+            return ""
+        self.openings = openings
+        return None
+
+
+class TravelCommand(MultiTurnCommand):
+    """Walk to a known tile along the shortest explored path."""
+
+    def __init__(self, x: int, y: int):
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.path: List[Tuple[int, int]] = []
+
+    def find_path(self, engine: Engine) -> List[Tuple[int, int]]:
+        game_map = engine.game_map
+
+        def known(area: Tuple[slice, slice]) -> np.ndarray:
+            # Only path over tiles the player knows about.
+            return np.array(
+                game_map.tiles["walkable"][area] & game_map.explored[area], dtype=np.int8, order="F")
+
+        start = (engine.player.x, engine.player.y)
+        distance = max(abs(self.x - start[0]), abs(self.y - start[1]))
+        if game_map.room_graph is not None and distance > cfg.HIERARCHICAL_PATH_DISTANCE:
+            path = game_map.room_graph.find_path(known, start, (self.x, self.y))
+            if path is not None:
+                return path
+        cost = known((slice(0, game_map.width), slice(0, game_map.height)))
+        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+        pathfinder = tcod.path.Pathfinder(graph)
+        pathfinder.add_root(start)
+        path: List[List[int]] = pathfinder.path_to((self.x, self.y))[
+            1:].tolist()
+        return [(index[0], index[1]) for index in path]
+
+    def start(self, engine: Engine) -> Optional[str]:
+        game_map = engine.game_map
+        if not game_map.in_bounds(self.x, self.y) or not game_map.explored[self.x, self.y]:
+            return "You don't know the way there."
+        reason = super().start(engine)
+        if reason:
+            return reason
+        self.path = self.find_path(engine)
+        if not self.path and (self.x, self.y) != (engine.player.x, engine.player.y):
+            return "You don't know the way there."
+        return None
+
+    def next_action(self, engine: Engine) -> Optional[Action]:
+        if not self.path:
+            return None
+        dest_x, dest_y = self.path.pop(0)
+        player = engine.player
+        return MovementAction(player, dest_x - player.x, dest_y - player.y)
+
+
+class AutoExploreCommand(MultiTurnCommand):
+    """Walk towards the nearest unexplored area until there is nothing left to explore."""
+
+    def next_action(self, engine: Engine) -> Optional[Action]:
+        player = engine.player
+        step = engine.game_map.explore_map.next_step(player.x, player.y)
+        if step is None:
+            engine.message_log.add_message(
+                "There is nothing left to explore.", color.impossible)
+            return None
+        return MovementAction(player, step[0] - player.x, step[1] - player.y)
+
+    def interrupted(self, engine: Engine) -> Optional[str]:
+        reason = super().interrupted(engine)
+        if reason is not None:
+            return reason
+        if item_underfoot(engine):
+            return "There is something here."
+        return None
@@ -0,0 +1,42 @@
+"""Memoized descriptions of what is under the mouse."""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+import game.render_functions as render_functions
+
+if TYPE_CHECKING:
+    from game.engine import Engine
+    from game.game_map import GameMap
+
+
+class ContextInfo:
+    """
+    Caches the names shown for each hovered tile until the map changes.
+
+    Results are kept per tile for one `GameMap.version`, so moving the mouse
+    around between turns only looks up each tile once.
+    """
+
+    def __init__(self) -> None:
+        self.game_map: Optional[GameMap] = None
+        self.version = -1
+        self.names: Dict[Tuple[int, int], str] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"game_map": None, "version": -1, "names": {}}
+
+    def names_at_mouse(self, engine: Engine) -> str:
+        game_map = engine.game_map
+        if game_map is not self.game_map or game_map.version != self.version:
+            self.game_map = game_map
+            self.version = game_map.version
+            self.names.clear()
+        # Keyed by map tile, the camera can move while the map stays the same.
+        mouse_x, mouse_y = engine.mouse_location
+        tile = game_map.camera.to_camera_coordinates(mouse_x, mouse_y)
+        names = self.names.get(tile)
+        if names is None:
+            names = self.names[tile] = render_functions.get_names_at_location(
+                x=mouse_x, y=mouse_y, game_map=game_map)
+        return names
@@ -1,21 +1,28 @@
 from __future__ import annotations
+from game.activity import Activity
 from game.camera import Camera
-from game.game_config import ACTIONS_HEIGHT, ACTIONS_WIDTH, CAMERA_HEIGHT, \
-    CAMERA_WIDTH, LOG_HEIGHT, LOG_WIDTH, MAP_HEIGHT, MAP_WIDTH, \
-    SIDEBAR_COMPONENT_HEIGHT, SIDEBAR_WIDTH
+from game.game_config import AI_COARSE_INTERVAL, FOV_RADIUS
 
 import lzma
 import pickle
-from typing import TYPE_CHECKING
+from typing import Any, Optional, Tuple, TYPE_CHECKING
 
 from tcod.console import Console
 from tcod.map import compute_fov
 
 import game.exceptions as exceptions
+import game.game_config as cfg
+from game.actor_pool import ActorPool
+from game.interface import Interface
 from game.message_log import MessageLog
-import game.render_functions as render_functions
+from game.profiler import profiler
+from game.replay import Recorder
+from game.rewind import RewindBuffer
+from game.rng import RNGService
+from game.status_effects import StatusEffects
 
 if TYPE_CHECKING:
+    from game.actions import Action
     from game.entity import Actor
     from game.game_map import GameMap, GameWorld
 
@@ -25,102 +32,131 @@ class Engine:
     game_world: GameWorld
     camera: Camera
 
-    def __init__(self, player: Actor, camera: Camera,):
+    def __init__(self, player: Actor, camera: Camera, seed: Optional[int] = None):
         self.message_log = MessageLog()
+        # Saved with the game, so a save keeps its seed and stream states.
+        self.rng = RNGService(seed)
         self.mouse_location = (0, 0)
         self.player = player
         self.camera = camera
+        self.status_effects = StatusEffects()
+        self.actor_pool = ActorPool()
+        self.interface = Interface()
+        # Cleared while multi-turn commands run, they recenter once at the end.
+        self.camera_follows_player = True
+        self.recorder: Optional[Recorder] = (
+            Recorder(self.rng.seed) if cfg.RECORD_SESSIONS else None)
+        self.rewind_buffer: Optional[RewindBuffer] = (
+            RewindBuffer() if cfg.REWIND_TURNS else None)
+
+    def perform_turn(self, action: Action) -> None:
+        """Perform the player's `action` then let the rest of the world take its turn.
+
+        Raises `exceptions.Impossible` without advancing the turn if the
+        action can't be performed.
+        """
+        # Encoded first, the action may use up the item it refers to.
+        record = self.recorder.encode(action) if self.recorder else None
+        if self.rewind_buffer is not None:
+            self.rewind_buffer.start_turn(self)
+        with profiler.phase("perform"):
+            action.perform()
+            self.player.fighter.tick_modifiers()
+
+        with profiler.phase("enemy_turns"):
+            self.handle_enemy_turns()
+
+        with profiler.phase("update_fov"):
+            self.update_fov()
+
+        if record is not None:
+            self.recorder.record_turn(record, self)
+        if self.rewind_buffer is not None:
+            self.rewind_buffer.end_turn(self)
+
+    def level_up(self, choice: int) -> None:
+        """Spend a level up on max HP (0), power (1) or defense (2)."""
+        level = self.player.level
+        (level.increase_max_hp, level.increase_power, level.increase_defense)[choice]()
+        if self.recorder:
+            self.recorder.record_level_up(choice)
 
     def handle_enemy_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
-                try:
+        """Run the turns of every actor whose turn comes up while the player acts.
+
+        How much work an actor gets depends on its distance from the player,
+        see `ActivityManager`.
+        """
+        game_map = self.game_map
+        scheduler = game_map.scheduler
+        activity = game_map.activity
+        activity.update(self.player.x, self.player.y)
+        self.status_effects.tick(self)
+        for entity in scheduler.advance(self.player.action_delay):
+            # Dead actors and actors which left this map lose their place in the turn order.
+            if not entity.ai or entity is self.player or entity not in game_map.entities:
+                continue
+            level = activity.activity_of(entity)
+            if level is Activity.DORMANT:
+                activity.sleep(entity)
+                continue
+            delay = entity.action_delay
+            try:
+                if level is Activity.FULL:
                     entity.ai.perform()
-                except exceptions.Impossible:
-                    pass  # Ignore impossible action exceptions from AI.
+                elif entity.ai.perform_coarse():
+                    delay *= AI_COARSE_INTERVAL  # Idle, check back on it less often.
+            except exceptions.Impossible:
+                pass  # Ignore impossible action exceptions from AI.
+            entity.fighter.tick_modifiers()
+            scheduler.schedule(entity, delay)
 
     def update_fov(self) -> None:
         """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=8,
+        game_map = self.game_map
+        x, y = self.player.x, self.player.y
+        # Nothing past the FOV radius can be visible, so only the window
+        # around the player is computed.
+        window = (
+            slice(max(0, x - FOV_RADIUS), x + FOV_RADIUS + 1),
+            slice(max(0, y - FOV_RADIUS), y + FOV_RADIUS + 1),
         )
+        game_map.visible[game_map.fov_window] = False
+        game_map.visible[window] = compute_fov(
+            game_map.tiles["transparent"][window],
+            (x - window[0].start, y - window[1].start),
+            radius=FOV_RADIUS,
+        )
+        game_map.fov_window = window
         # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+        game_map.explored[window] |= game_map.visible[window]
+        game_map.explore_map.mark_dirty(window)
+        game_map.version += 1
+
+    @property
+    def render_version(self) -> Tuple[Any, ...]:
+        """Changes whenever something drawn by `render` may have changed."""
+        game_map = self.game_map
+        fighter = self.player.fighter
+        return (
+            game_map,
+            game_map.version,
+            self.message_log.version,
+            fighter.hp,
+            fighter.max_hp,
+            self.mouse_location,
+            self.camera.x,
+            self.camera.y,
+        )
 
     def render(self, console: Console) -> None:
-        # Render frame with map inside
-        render_functions.render_frame(
-            console, 'GUI', 0, 0, CAMERA_WIDTH, CAMERA_HEIGHT)
+        self.interface.render_chrome(console)
         self.game_map.render(console)
-        # Render sidebar
-        render_functions.render_widget(
-            console=console,
-            widget='DIAGNOSTIC',
-            x=CAMERA_WIDTH,
-            y=0,
-            width=SIDEBAR_WIDTH,
-            height=SIDEBAR_COMPONENT_HEIGHT,
-            render_function=render_functions.render_bar,
-            current_value=self.player.fighter.hp,
-            maximum_value=self.player.fighter.max_hp,
-            total_width=20,
-        )
-
-        render_functions.render_widget(
-            console=console,
-            widget='CONTEXT',
-            x=CAMERA_WIDTH,
-            y=SIDEBAR_COMPONENT_HEIGHT,
-            width=SIDEBAR_WIDTH,
-            height=SIDEBAR_COMPONENT_HEIGHT,
-            render_function=render_functions.render_names_at_mouse_location,
-            engine=self,
-        )
-
-        render_functions.render_widget(
-            console=console,
-            widget='SPAWNED DAEMONS',
-            x=CAMERA_WIDTH,
-            y=SIDEBAR_COMPONENT_HEIGHT * 2,
-            width=SIDEBAR_WIDTH,
-            height=SIDEBAR_COMPONENT_HEIGHT,
-            render_function=None,
-        )
-
-        render_functions.render_widget(
-            console=console,
-            widget='OBJECTIVES',
-            x=CAMERA_WIDTH,
-            y=SIDEBAR_COMPONENT_HEIGHT * 3,
-            width=SIDEBAR_WIDTH,
-            height=SIDEBAR_COMPONENT_HEIGHT,
-            render_function=None,
-        )
-
-        render_functions.render_widget(
-            console=console,
-            widget='ACTION STACK',
-            x=0,
-            y=CAMERA_HEIGHT,
-            width=ACTIONS_WIDTH,
-            height=ACTIONS_HEIGHT,
-            render_function=None,
-        )
-
-        render_functions.render_widget(
-            console=console,
-            widget='LOG',
-            x=0,
-            y=CAMERA_HEIGHT+ACTIONS_HEIGHT,
-            width=LOG_WIDTH,
-            height=LOG_HEIGHT,
-            render_function=self.message_log.render,
-        )
+        self.interface.render_widgets(console, self)
 
     def save_as(self, filename: str) -> None:
         """Save this Engine instance as a compressed file."""
+        self.message_log.flush()
         save_data = lzma.compress(pickle.dumps(self))
         with open(filename, "wb") as f:
             f.write(save_data)
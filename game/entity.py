@@ -5,6 +5,7 @@ import math
 from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union
 
 from game.render_order import RenderOrder
+from game.scheduler import ACTION_COST, NORMAL_SPEED
 
 if TYPE_CHECKING:
     from components.ai import BaseAI
@@ -47,7 +48,7 @@ class Entity:
         if parent:
             # If parent isn't provided now then it will be set later.
             self.parent = parent
-            parent.entities.add(self)
+            parent.add_entity(self)
 
     @property
     def gamemap(self) -> GameMap:
@@ -59,7 +60,7 @@ class Entity:
         clone.x = x
         clone.y = y
         clone.parent = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
         return clone
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
@@ -69,9 +70,11 @@ class Entity:
         if gamemap:
             if hasattr(self, "parent"):  # Possibly uninitialized.
                 if self.parent is self.gamemap:
-                    self.gamemap.entities.remove(self)
+                    self.gamemap.remove_entity(self)
             self.parent = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+        else:
+            self.gamemap.entity_moved(self)
 
     def distance(self, x: int, y: int) -> float:
         """
@@ -83,6 +86,7 @@ class Entity:
         # Move the entity by a given amount
         self.x += dx
         self.y += dy
+        self.gamemap.entity_moved(self)
 
 
 class Actor(Entity):
@@ -99,6 +103,7 @@ class Actor(Entity):
         fighter: Fighter,
         inventory: Inventory,
         level: Level,
+        speed: int = NORMAL_SPEED,
     ):
         super().__init__(
             x=x,
@@ -124,11 +129,35 @@ class Actor(Entity):
         self.level = level
         self.level.parent = self
 
+        self.speed = speed
+        # Counts the times this actor was recycled, see `ActorPool`.
+        self.generation = 0
+
     @property
     def is_alive(self) -> bool:
         """Returns True as long as this actor can perform actions."""
         return bool(self.ai)
 
+    @property
+    def action_delay(self) -> int:
+        """Game time between this actor's turns, faster actors have shorter delays."""
+        return ACTION_COST * NORMAL_SPEED // self.speed
+
+    def spawn(self, gamemap: GameMap, x: int, y: int) -> Actor:
+        """Spawn a copy of this actor and give it a place in the turn order.
+
+        A dead actor of the same kind is reused if one is pooled.
+        """
+        clone = gamemap.engine.actor_pool.acquire(self)
+        if clone is None:
+            clone = copy.deepcopy(self)
+        clone.x = x
+        clone.y = y
+        clone.parent = gamemap
+        gamemap.add_entity(clone)
+        gamemap.scheduler.schedule(clone, clone.action_delay)
+        return clone
+
 
 class Item(Entity):
     def __init__(
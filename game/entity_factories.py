@@ -57,6 +57,20 @@ health_potion = Item(
     name="Health Potion",
     consumable=consumable.HealingConsumable(amount=4),
 )
+strength_potion = Item(
+    char="!",
+    color=(255, 127, 0),
+    name="Strength Potion",
+    consumable=consumable.StatBoostConsumable(
+        "strength", number_of_turns=20, power=3),
+)
+poison_cloud_scroll = Item(
+    char="~",
+    color=(63, 191, 63),
+    name="Poison Cloud Scroll",
+    consumable=consumable.PoisonCloudConsumable(
+        damage=2, number_of_turns=8, radius=3),
+)
 lightning_scroll = Item(
     char="~",
     color=(255, 255, 0),
@@ -0,0 +1,195 @@
+"""A game without a window which bots play through numbered actions.
+
+It follows the Gym interface without depending on it:
+
+    env = GameEnv()
+    observation = env.reset(seed=1)
+    observation, reward, done, info = env.step(action)
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import game.actions as actions
+import game.exceptions as exceptions
+from game.render_order import RenderOrder
+
+if TYPE_CHECKING:
+    from game.engine import Engine
+    from game.game_map import GameMap
+
+# Directions of the bump actions, in the order of their action ids.
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (1, -1), (-1, 1), (1, 1))
+
+WAIT = 0
+BUMP = 1  # To BUMP + 7, see DIRECTIONS.
+PICKUP = 9
+TAKE_STAIRS = 10
+LEVEL_UP = 11  # To LEVEL_UP + 2, see `Engine.level_up`.
+NUMBER_OF_ACTIONS = 14
+
+# The layers of an observation, in the order a batch stacks them.
+LAYERS = ("walkable", "visible", "explored", "actors", "hp", "items")
+VIEWS = LAYERS[:3]  # Views of the map.
+BUFFERS = LAYERS[3:]  # Written by the environment.
+
+# Values of the "actors" layer.
+PLAYER = 1
+ENEMY = 2
+
+Observation = Dict[str, np.ndarray]
+
+
+def read_only(array: np.ndarray) -> np.ndarray:
+    """Return a view of `array` which can't be written through."""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class GameEnv:
+    """
+    A game played one action id at a time, for training bots.
+
+    Observations are a dict of (width, height) layers:
+
+    - walkable, visible, explored: views of the map's own arrays.
+    - actors: PLAYER or ENEMY where a visible actor stands.
+    - hp: the HP of those actors.
+    - items: True where a visible item lies.
+
+    Nothing is copied per step, the views only change with the floor and the
+    other layers are buffers which are updated in place.  The same arrays are
+    returned by every step, copy them to keep an observation.
+
+    The reward of a step is the XP it earned plus `floor_reward` for each
+    floor descended.
+
+    `buffers` are the arrays to use as the actors, hp and items layers, for
+    example slices of a batch's buffer, see `VectorEnv`.
+    """
+
+    def __init__(
+        self, floor_reward: float = 10.0, buffers: Optional[Observation] = None,
+    ):
+        self.floor_reward = floor_reward
+        self.engine: Optional[Engine] = None
+        self.game_map: Optional[GameMap] = None
+        self.observation: Observation = dict(buffers or {})
+        # The cells of each buffer layer written by the last observation.
+        self.cells: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.turns = 0
+
+    def reset(self, seed: Optional[int] = None) -> Observation:
+        """Start a new game and return its first observation."""
+        import game.setup_game as setup_game
+
+        engine = setup_game.new_game(seed=seed)
+        # Nothing is kept of a bot's games.
+        engine.recorder = None
+        engine.rewind_buffer = None
+        engine.message_log.archive_path = None
+        self.engine = engine
+        self.game_map = None
+        self.turns = 0
+        return self.observe()
+
+    def step(self, action: int) -> Tuple[Observation, float, bool, Dict[str, Any]]:
+        """Perform the player's action, returns (observation, reward, done, info).
+
+        An action which isn't possible takes no turn and is flagged with
+        info["impossible"].
+        """
+        engine = self.engine
+        if engine is None:
+            raise RuntimeError("Call reset before step.")
+        player = engine.player
+        if not player.is_alive:
+            raise RuntimeError("The game is over, call reset.")
+        xp = player.level.current_xp
+        floor = engine.game_world.current_floor
+        reward = 0.0
+        impossible = False
+        try:
+            if LEVEL_UP <= action < NUMBER_OF_ACTIONS:
+                if not player.level.requires_level_up:
+                    raise exceptions.Impossible("There is no level up to spend.")
+                engine.level_up(action - LEVEL_UP)
+            else:
+                engine.perform_turn(self.action(action))
+                self.turns += 1
+                reward = player.level.current_xp - xp + self.floor_reward * (
+                    engine.game_world.current_floor - floor)
+        except exceptions.Impossible:
+            impossible = True
+
+        done = not player.is_alive
+        info = {
+            "impossible": impossible,
+            "turns": self.turns,
+            "floor": engine.game_world.current_floor,
+            "hp": player.fighter.hp,
+            "level_up": player.level.requires_level_up,
+        }
+        return self.observe(), reward, done, info
+
+    def action(self, action: int) -> actions.Action:
+        """Return the player's action for an action id."""
+        player = self.engine.player
+        if action == WAIT:
+            return actions.WaitAction(player)
+        if BUMP <= action < BUMP + len(DIRECTIONS):
+            return actions.BumpAction(player, *DIRECTIONS[action - BUMP])
+        if action == PICKUP:
+            return actions.PickupAction(player)
+        if action == TAKE_STAIRS:
+            return actions.TakeStairsAction(player)
+        raise ValueError(f"Unknown action {action}.")
+
+    def observe(self) -> Observation:
+        """Update the observation layers to the current state of the game."""
+        game_map = self.engine.game_map
+        observation = self.observation
+        if game_map is not self.game_map:
+            self.game_map = game_map
+            shape = game_map.width, game_map.height
+            observation["walkable"] = read_only(game_map.tiles["walkable"])
+            observation["visible"] = read_only(game_map.visible)
+            observation["explored"] = read_only(game_map.explored)
+            if "actors" not in observation:
+                observation["actors"] = np.zeros(shape, dtype=np.int8, order="F")
+                observation["hp"] = np.zeros(shape, dtype=np.int16, order="F")
+                observation["items"] = np.zeros(shape, dtype=bool, order="F")
+            for name in BUFFERS:
+                if observation[name].shape != shape:
+                    raise ValueError(f"The {name} layer doesn't fit a {shape} map.")
+                observation[name].fill(0)
+            self.cells = {}
+
+        # Clear only the cells written last time.
+        for name, cells in self.cells.items():
+            observation[name][cells] = 0
+        visible = game_map.visible
+        buckets = game_map.render_index.buckets
+
+        actors = buckets[RenderOrder.ACTOR]
+        n = actors.count
+        shown = np.flatnonzero(visible[actors.xs[:n], actors.ys[:n]])
+        cells = actors.xs[shown], actors.ys[shown]
+        player = self.engine.player
+        observation["actors"][cells] = [
+            PLAYER if actors.entities[i] is player else ENEMY for i in shown.tolist()]
+        observation["hp"][cells] = [
+            actors.entities[i].fighter.hp for i in shown.tolist()]
+        self.cells["actors"] = self.cells["hp"] = cells
+
+        items = buckets[RenderOrder.ITEM]
+        n = items.count
+        xs, ys = items.xs[:n], items.ys[:n]
+        shown = visible[xs, ys]
+        cells = xs[shown], ys[shown]
+        observation["items"][cells] = True
+        self.cells["items"] = cells
+        return observation
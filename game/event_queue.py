@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Iterable, Iterator
+
+import tcod
+
+import game.game_config as cfg
+
+
+class EventQueue:
+    """
+    Buffers input events between frames so a frame never falls behind input.
+
+    Consecutive mouse motions are collapsed into the latest one, and at most
+    `max_turns_per_frame` key presses are handled per frame.  Key repeats past
+    that limit are dropped, other key presses wait for the next frame.
+    """
+
+    def __init__(self, max_turns_per_frame: int = cfg.MAX_TURNS_PER_FRAME):
+        self.max_turns_per_frame = max_turns_per_frame
+        self.pending: Deque[tcod.event.Event] = deque()
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def extend(self, events: Iterable[tcod.event.Event]) -> None:
+        """Queue new events, collapsing consecutive mouse motions."""
+        pending = self.pending
+        for event in events:
+            if (
+                isinstance(event, tcod.event.MouseMotion)
+                and pending
+                and isinstance(pending[-1], tcod.event.MouseMotion)
+            ):
+                pending[-1] = event
+            else:
+                pending.append(event)
+
+    def drain(self) -> Iterator[tcod.event.Event]:
+        """Yield the events to handle this frame."""
+        pending = self.pending
+        key_presses = 0
+        while pending:
+            event = pending[0]
+            if isinstance(event, tcod.event.KeyDown):
+                if key_presses >= self.max_turns_per_frame:
+                    if event.repeat:
+                        pending.popleft()  # A held key, only the newest repeats matter.
+                        continue
+                    break  # Leave the rest of the input for the next frame.
+                key_presses += 1
+            yield pending.popleft()
@@ -0,0 +1,152 @@
+"""A cached Dijkstra map leading from anywhere on a floor to its unexplored edges."""
+from __future__ import annotations
+
+from typing import Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+import tcod
+
+import game.game_config as cfg
+
+if TYPE_CHECKING:
+    from game.game_map import GameMap
+
+UNREACHABLE = np.iinfo(np.int32).max
+
+Window = Tuple[slice, slice]
+
+
+def frontier(walkable: np.ndarray, explored: np.ndarray) -> np.ndarray:
+    """Return the explored, walkable tiles which touch an unexplored tile."""
+    # Tiles past the edge of the array count as explored.
+    unexplored = np.pad(~explored, 1, constant_values=False)
+    width, height = explored.shape
+    near_unexplored = np.zeros_like(explored)
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            if dx != 1 or dy != 1:
+                near_unexplored |= unexplored[dx: dx +
+                                              width, dy: dy + height]
+    return walkable & explored & near_unexplored
+
+
+class ExploreMap:
+    """
+    Distances from every known tile to the nearest frontier tile, the
+    explored and walkable tiles next to unexplored ones.
+
+    When `GameMap.explored` grows only a window around the change is
+    recomputed, seeded with the cached distances around the window.  Distances
+    outside the window can then be too low for a while, which shows up as a
+    dead end when walking down the map and causes a full rebuild.
+    """
+
+    def __init__(self, game_map: GameMap):
+        self.game_map = game_map
+        shape = (game_map.width, game_map.height)
+        self.distance = np.full(shape, UNREACHABLE, dtype=np.int32, order="F")
+        # The explored array the distances were last computed for.
+        self.known = np.zeros(shape, dtype=bool, order="F")
+        self.valid = False
+        # Bounds (x1, y1, x2, y2) of where `explored` may have changed since.
+        self.dirty: Optional[Tuple[int, int, int, int]] = None
+
+    def mark_dirty(self, window: Window) -> None:
+        """Note that `GameMap.explored` may have changed inside `window`."""
+        x1, x2 = window[0].start, min(window[0].stop, self.game_map.width)
+        y1, y2 = window[1].start, min(window[1].stop, self.game_map.height)
+        if self.dirty is not None:
+            x1, y1 = min(x1, self.dirty[0]), min(y1, self.dirty[1])
+            x2, y2 = max(x2, self.dirty[2]), max(y2, self.dirty[3])
+        self.dirty = x1, y1, x2, y2
+
+    def rebuild(self) -> None:
+        game_map = self.game_map
+        explored = game_map.explored
+        self.distance[...] = UNREACHABLE
+        self.distance[frontier(game_map.tiles["walkable"], explored)] = 0
+        tcod.path.dijkstra2d(
+            self.distance, self.cost((slice(None), slice(None))), 2, 3, out=self.distance)
+        self.known[...] = explored
+        self.valid = True
+        self.dirty = None
+
+    def cost(self, window: Window) -> np.ndarray:
+        """Known tiles can be walked on, unexplored tiles are treated as walls."""
+        game_map = self.game_map
+        return np.asarray(
+            game_map.tiles["walkable"][window] & game_map.explored[window], dtype=np.int8)
+
+    def changed_window(self) -> Optional[Window]:
+        """Return the area around the tiles explored since the last update."""
+        if self.dirty is None:
+            return None
+        x1, y1, x2, y2 = self.dirty
+        self.dirty = None
+        xs, ys = np.nonzero(
+            self.game_map.explored[x1:x2, y1:y2] != self.known[x1:x2, y1:y2])
+        if not len(xs):
+            return None
+        margin = cfg.EXPLORE_UPDATE_MARGIN
+        return (
+            slice(max(0, x1 + xs.min() - margin),
+                  min(self.game_map.width, x1 + xs.max() + margin + 1)),
+            slice(max(0, y1 + ys.min() - margin),
+                  min(self.game_map.height, y1 + ys.max() + margin + 1)),
+        )
+
+    def update(self) -> None:
+        """Bring the distances up to date with `GameMap.explored`."""
+        if not self.valid:
+            self.rebuild()
+            return
+        window = self.changed_window()
+        if window is None:
+            return
+        game_map = self.game_map
+        # Include a ring of tiles around the window to find the frontier on its
+        # edge, and to seed it with the distances around it.
+        outer = tuple(
+            slice(max(0, s.start - 1), min(size, s.stop + 1))
+            for s, size in zip(window, (game_map.width, game_map.height))
+        )
+        inner = tuple(
+            slice(s.start - o.start, s.stop - o.start) for s, o in zip(window, outer)
+        )
+        distance = self.distance[outer].copy()
+        distance[inner] = UNREACHABLE
+        edge = frontier(
+            game_map.tiles["walkable"][outer], game_map.explored[outer])
+        distance[inner][edge[inner]] = 0
+        tcod.path.dijkstra2d(distance, self.cost(outer), 2, 3, out=distance)
+        self.distance[window] = distance[inner]
+        self.known[window] = game_map.explored[window]
+
+    def next_step(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """Return the neighbour of (x, y) closest to the frontier.
+
+        Returns None if nothing is left to explore from (x, y).
+        """
+        self.update()
+        step = self.downhill(x, y)
+        if step is None:
+            # Either everything reachable is explored or the cache led into a
+            # dead end, rebuilding tells which.
+            self.rebuild()
+            step = self.downhill(x, y)
+        return step
+
+    def downhill(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        distance = self.distance
+        best = distance[x, y]
+        if best == UNREACHABLE:
+            return None
+        step = None
+        width, height = distance.shape
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height and distance[nx, ny] < best:
+                    best = distance[nx, ny]
+                    step = nx, ny
+        return step
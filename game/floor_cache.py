@@ -0,0 +1,116 @@
+"""A directory of generated floors, so that a seeded floor is only generated once."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+import game.game_config as cfg
+from game.procgen import FloorPlan, GENERATOR_VERSION
+import game.tile_types as tile_types
+
+# The tiles a floor can be made of, stored as an index into this array.
+PALETTE = np.array([tile_types.wall, tile_types.floor, tile_types.down_stairs])
+
+
+class FloorCache:
+    """
+    Floors stored by a key made from everything which decides what a floor
+    looks like: the generator version, the seed, the floor number and the
+    `GameWorld` parameters.
+
+    Each floor is stored as three files named after its key: the tiles as a
+    `.npy` array of indices into `PALETTE`, the tunnels as a `.tunnels.npy`
+    array of points, both loaded memory mapped, and the rest of its
+    `FloorPlan` as `.json`.  The least recently used floors are removed once
+    the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = cfg.FLOOR_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(seed: int, floor: int, parameters: Dict[str, int]) -> str:
+        blob = json.dumps([GENERATOR_VERSION, seed, floor, sorted(parameters.items())])
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def paths(self, key: str) -> Tuple[str, str, str]:
+        base = os.path.join(self.directory, key)
+        return base + ".npy", base + ".tunnels.npy", base + ".json"
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, FloorPlan]]:
+        """Return the tiles and plan stored under `key`, or None."""
+        tiles_path, tunnels_path, plan_path = self.paths(key)
+        try:
+            with open(plan_path) as f:
+                plan = json.load(f)
+            indices = np.load(tiles_path, mmap_mode="r")
+            points = np.load(tunnels_path, mmap_mode="r")
+            os.utime(plan_path)  # Mark as recently used.
+        except (OSError, ValueError):
+            return None
+        ends = np.cumsum(plan["tunnel_lengths"]).tolist()
+        points = points.tolist()
+        return np.take(PALETTE, indices), FloorPlan(
+            start=tuple(plan["start"]),
+            downstairs=tuple(plan["downstairs"]),
+            rooms=[tuple(room) for room in plan["rooms"]],
+            tunnels=[points[end - length:end]
+                     for end, length in zip(ends, plan["tunnel_lengths"])],
+            spawns=[tuple(spawn) for spawn in plan["spawns"]],
+        )
+
+    def store(self, key: str, tiles: np.ndarray, plan: FloorPlan) -> None:
+        """Store a floor under `key`, does nothing if it has unknown tiles."""
+        indices = np.zeros(tiles.shape, dtype=np.uint8, order="F")
+        known = np.zeros(tiles.shape, dtype=bool, order="F")
+        for i, tile in enumerate(PALETTE):
+            is_tile = tiles == tile
+            indices[is_tile] = i
+            known |= is_tile
+        if not known.all():
+            return
+        points = np.array([xy for tunnel in plan.tunnels for xy in tunnel],
+                          dtype=np.int16).reshape(-1, 2)
+        meta = plan._asdict()
+        del meta["tunnels"]
+        meta["tunnel_lengths"] = [len(tunnel) for tunnel in plan.tunnels]
+
+        tiles_path, tunnels_path, plan_path = self.paths(key)
+        # The plan is written last, a floor without one is never loaded.
+        for path, array in ((tiles_path, indices), (tunnels_path, points)):
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        with open(plan_path + ".tmp", "w") as f:
+            json.dump(meta, f, separators=(",", ":"))
+        os.replace(plan_path + ".tmp", plan_path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used floors until the cache fits in `max_bytes`."""
+        floors: Dict[str, List[float]] = {}  # key: [last used, size]
+        for entry in os.scandir(self.directory):
+            key, _, extension = entry.name.partition(".")
+            if extension not in ("npy", "tunnels.npy", "json"):
+                continue
+            stat = entry.stat()
+            floor = floors.setdefault(key, [0.0, 0])
+            floor[1] += stat.st_size
+            if extension == "json":
+                floor[0] = stat.st_mtime
+        total = sum(size for _, size in floors.values())
+        for key, (_, size) in sorted(floors.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            for path in self.paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
@@ -1,3 +1,5 @@
+import os
+
 import tcod
 
 TITLE = 'Untitle Hacking Game'
@@ -15,6 +17,8 @@ CAMERA_HEIGHT = 40
 MAP_WIDTH = 160
 MAP_HEIGHT = 80
 
+FOV_RADIUS = 8
+
 SIDEBAR_WIDTH = SCREEN_WIDTH - CAMERA_WIDTH
 
 SIDEBAR_COMPONENT_HEIGHT = SCREEN_HEIGHT // 4
@@ -24,3 +28,84 @@ ACTIONS_WIDTH = CAMERA_WIDTH
 
 LOG_HEIGHT = SCREEN_HEIGHT - (ACTIONS_HEIGHT + CAMERA_HEIGHT)
 LOG_WIDTH = CAMERA_WIDTH
+
+# Number of messages kept in the message log, older messages are appended to
+# the archive file (if set) before being dropped.  The archive is written this
+# many messages at a time, and on save and exit.  It is only appended to, so
+# it keeps the messages of every game played in this directory.
+MESSAGE_LOG_CAPACITY = 1000
+MESSAGE_LOG_ARCHIVE = "message_archive.txt"
+MESSAGE_LOG_ARCHIVE_BATCH = 100
+
+# Main loop profiling, also enabled by setting the GAME_PROFILE environment
+# variable.  F3 toggles the overlay and F4 writes the trace files.
+PROFILE = bool(os.environ.get("GAME_PROFILE"))
+PROFILER_WINDOW = 300  # Samples per phase used for the rolling percentiles.
+PROFILER_TRACE_LIMIT = 100_000
+PROFILER_TRACE_FILE = "profile_trace"
+
+# AI level of detail.  Actors within AI_FULL_RADIUS tiles of the player run
+# their full AI, actors further away run a cheap update and idle actors only
+# act every AI_COARSE_INTERVAL turns.  Actors more than AI_DORMANT_CHUNK_RADIUS
+# chunks of AI_CHUNK_SIZE tiles away from the player go dormant until the
+# player gets close, they hear a noise or they are hurt.
+AI_FULL_RADIUS = 12
+AI_COARSE_INTERVAL = 4
+AI_CHUNK_SIZE = 16
+AI_DORMANT_CHUNK_RADIUS = 2
+AI_COMBAT_NOISE_RADIUS = 10
+
+# Key presses handled per frame, queued key repeats past this are dropped so
+# holding a key never lets the screen fall behind.
+MAX_TURNS_PER_FRAME = 3
+
+# Most turns a multi-turn command (rest, run, travel) takes before it stops.
+MULTI_TURN_LIMIT = 500
+REST_TURN_LIMIT = 100
+
+# Resting heals 1 HP every this many turns, see RestCommand.
+REGENERATION_TURNS = 5
+
+# Tiles around newly explored tiles recomputed by the auto-explore map.
+EXPLORE_UPDATE_MARGIN = 8
+
+# Paths longer than this many tiles are planned over the rooms of a floor first,
+# see RoomGraph.
+HIERARCHICAL_PATH_DISTANCE = 24
+
+# Dead actors kept for reuse by new spawns.
+ACTOR_POOL_CAPACITY = 256
+
+# Seed of new games, None picks a random one.  Set the GAME_SEED environment
+# variable to replay the same dungeon.
+SEED = int(os.environ["GAME_SEED"]) if os.environ.get("GAME_SEED") else None
+
+# Directory of cached generated floors, also set by the GAME_FLOOR_CACHE
+# environment variable.  None turns the cache off.  The least recently used
+# floors are removed once it holds more than FLOOR_CACHE_MAX_BYTES.
+FLOOR_CACHE_DIR = os.environ.get("GAME_FLOOR_CACHE") or None
+FLOOR_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Record the player's actions, also enabled by setting the GAME_RECORD
+# environment variable.  The recording is written to RECORDING_FILE on exit
+# and can be replayed with `python -m game.replay`.  A checksum of the game is
+# recorded every REPLAY_CHECKSUM_INTERVAL turns.
+RECORD_SESSIONS = bool(os.environ.get("GAME_RECORD"))
+RECORDING_FILE = "session.rec"
+REPLAY_CHECKSUM_INTERVAL = 50
+
+# Turns which can be undone with backspace, set by the GAME_REWIND environment
+# variable.  0 turns rewinding off.  The whole state is kept every
+# REWIND_KEYFRAME_INTERVAL turns so rewinding far back stays cheap.
+REWIND_TURNS = int(os.environ.get("GAME_REWIND") or 0)
+REWIND_KEYFRAME_INTERVAL = 25
+
+# Play in the terminal with ANSI escapes in place of a window, for example
+# over SSH.  Set by the GAME_TERMINAL environment variable.
+TERMINAL = bool(os.environ.get("GAME_TERMINAL"))
+TERMINAL_FPS = 30
+
+# Stream the screen to spectators, watched with `python -m game.spectator`.
+# Set by the GAME_SPECTATE environment variable to "unix:PATH", "HOST:PORT"
+# or "PORT", None turns streaming off.
+SPECTATOR_ADDRESS = os.environ.get("GAME_SPECTATE") or None
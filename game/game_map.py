@@ -2,18 +2,25 @@ from __future__ import annotations
 from game.camera import Camera
 from game.render_functions import render_frame
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+from typing import Dict, Iterable, Iterator, List, Optional, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 from tcod.console import Console
 
+from game.activity import ActivityManager
 from game.entity import Actor, Item
+from game.explore import ExploreMap
+from game.render_index import RenderIndex
+from game.room_graph import RoomGraph
+from game.scheduler import TurnScheduler
+import game.game_config as cfg
 import game.tile_types as tile_types
 import game.color as color
 
 if TYPE_CHECKING:
     from game.engine import Engine
     from game.entity import Entity
+    from game.procgen import FloorPlan
 
 
 class GameMap:
@@ -23,7 +30,14 @@ class GameMap:
         self.engine = engine
         self.camera = camera
         self.width, self.height = width, height
-        self.entities = set(entities)
+        # Used as an ordered set, so that the game plays the same way every
+        # time for the same seed and actions, see game.replay.
+        self.entities: Dict[Entity, None] = dict.fromkeys(entities)
+        # Bumped whenever something that can be seen on the map changes.
+        self.version = 0
+        self.render_index = RenderIndex()
+        for entity in self.entities:
+            self.render_index.add(entity)
         self.tiles = np.full(
             (self.width, self.height), fill_value=tile_types.wall, order="F")
 
@@ -33,13 +47,50 @@ class GameMap:
         self.explored = np.full(
             (self.width, self.height), fill_value=False, order="F"
         )  # Tiles the player has seen before
+        # The area of `visible` which was last computed, everything else is False.
+        self.fov_window = (slice(0, 0), slice(0, 0))
 
         self.downstairs_location = (0, 0)
+        # Remains of dead actors, an index into `corpse_names` for each tile or -1.
+        self.corpses = np.full(
+            (self.width, self.height), fill_value=-1, dtype=np.int16, order="F")
+        self.corpse_names: List[str] = []
+        self.corpse_name_index: Dict[str, int] = {}
+
+        # Rooms and corridors of the floor, if it was generated from rooms.
+        self.room_graph: Optional[RoomGraph] = None
+        # How the floor was generated, used to cache it.
+        self.plan: Optional[FloorPlan] = None
+
+        # Turn order of the actors on this map, the player isn't part of it.
+        self.scheduler = TurnScheduler()
+        self.activity = ActivityManager(self)
+        self.explore_map = ExploreMap(self)
 
     @property
     def gamemap(self) -> GameMap:
         return self
 
+    def add_entity(self, entity: Entity) -> None:
+        self.entities[entity] = None
+        self.render_index.add(entity)
+        self.version += 1
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove `entity` from this map, does nothing if it isn't here."""
+        self.entities.pop(entity, None)
+        self.render_index.remove(entity)
+        self.version += 1
+
+    def entity_moved(self, entity: Entity) -> None:
+        self.render_index.moved(entity)
+        self.version += 1
+
+    def entity_changed(self, entity: Entity) -> None:
+        """Call after changing the char, color, name or render order of `entity`."""
+        self.render_index.changed(entity)
+        self.version += 1
+
     @property
     def actors(self) -> Iterator[Actor]:
         """Iterate over this maps living actors."""
@@ -73,6 +124,19 @@ class GameMap:
 
         return None
 
+    def add_corpse(self, x: int, y: int, name: str) -> None:
+        """Leave remains named `name` at (x, y), replacing any already there."""
+        index = self.corpse_name_index.get(name)
+        if index is None:
+            index = self.corpse_name_index[name] = len(self.corpse_names)
+            self.corpse_names.append(name)
+        self.corpses[x, y] = index
+        self.version += 1
+
+    def corpse_at(self, x: int, y: int) -> Optional[str]:
+        index = self.corpses[x, y]
+        return self.corpse_names[index] if index >= 0 else None
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
@@ -89,37 +153,24 @@ class GameMap:
 
         (height, width) = self.camera.height, self.camera.width
 
+        # Only the tiles inside the camera are drawn.
+        frame = (slice(x, x + width), slice(y, y + height))
+        visible = self.visible[frame]
         tiles_in_frame = np.select(
-            condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
+            condlist=[visible, self.explored[frame]],
+            choicelist=[self.tiles["light"][frame], self.tiles["dark"][frame]],
             default=tile_types.SHROUD,
         )
-        # Come up with the rows and columns off screen that should be removed from the tiles
-        # It seems like there should be an easier or better way to do this.
-        # TODO: Find better way to remove off screen tiles
-        rows_to_delete = [n for n in range(
-            0, x)] + [n for n in range(x + width, len(tiles_in_frame))]
-        columns_to_delete = [n for n in range(
-            0, y)] + [n for n in range(y + height, len(tiles_in_frame[0]))]
-
-        tiles_in_frame = np.delete(tiles_in_frame, rows_to_delete, axis=0)
-        tiles_in_frame = np.delete(tiles_in_frame, columns_to_delete, axis=1)
         # Creating a new console to blit into the main console later
         new_console = Console(width, height, 'F')
         # Remember that tiles is the raw 2d tiles array
         new_console.tiles_rgb[0: width, 0: height] = tiles_in_frame
-        # Grab all the entities that should be visible on the camera frame
-        entities_in_frame = [entity for entity in self.entities if entity.x >=
-                             x and entity.y >= y and entity.x < x + self.camera.map_width and entity.y < y + self.camera.map_height]
-        # Sort entities by their render order so they show up correctly
-        entities_sorted_for_rendering = sorted(
-            entities_in_frame, key=lambda x: x.render_order.value
-        )
-        for entity in entities_sorted_for_rendering:
-            if self.visible[entity.x, entity.y]:
-                new_console.print(
-                    x=entity.x - x, y=entity.y - y, string=entity.char, fg=entity.color
-                )
+        # Draw the visible remains under the entities.
+        corpses = (self.corpses[frame] >= 0) & visible
+        new_console.tiles_rgb["ch"][:width, :height][corpses] = ord("%")
+        new_console.tiles_rgb["fg"][:width, :height][corpses] = color.corpse
+        # Entities are drawn from arrays in render order, see RenderIndex.
+        self.render_index.draw(new_console.tiles_rgb, self.visible, x, y)
         # Setting the screen offset here which feels a little hacky
         self.camera.screen_offset_x = 1
         self.camera.screen_offset_y = 1
@@ -157,10 +208,35 @@ class GameWorld:
 
         self.current_floor = current_floor
 
+    @property
+    def parameters(self) -> Dict[str, int]:
+        """The settings which decide what a generated floor looks like."""
+        return {
+            "map_width": self.map_width,
+            "map_height": self.map_height,
+            "max_rooms": self.max_rooms,
+            "room_min_size": self.room_min_size,
+            "room_max_size": self.room_max_size,
+        }
+
     def generate_floor(self) -> None:
-        from game.procgen import generate_dungeon
+        from game.floor_cache import FloorCache
+        from game.procgen import build_dungeon, generate_dungeon
 
         self.current_floor += 1
+        # The actors of the last floor are gone, only the player keeps its effects.
+        self.engine.status_effects.clear(keep=(self.engine.player,))
+
+        cache = key = None
+        if cfg.FLOOR_CACHE_DIR:
+            cache = FloorCache(cfg.FLOOR_CACHE_DIR)
+            key = cache.key(self.engine.rng.seed,
+                            self.current_floor, self.parameters)
+            cached = cache.load(key)
+            if cached is not None:
+                self.engine.game_map = build_dungeon(
+                    *cached, engine=self.engine, camera=self.camera)
+                return
 
         self.engine.game_map = generate_dungeon(
             max_rooms=self.max_rooms,
@@ -171,3 +247,6 @@ class GameWorld:
             engine=self.engine,
             camera=self.camera,
         )
+        if cache is not None:
+            cache.store(key, self.engine.game_map.tiles,
+                        self.engine.game_map.plan)
@@ -3,8 +3,9 @@ from game.animation import AnimationHandler
 
 import os
 
-from typing import Callable, Optional, Tuple, TYPE_CHECKING, Union
+from typing import Any, Callable, Optional, Tuple, TYPE_CHECKING, Union
 
+import numpy as np  # type: ignore
 import tcod
 
 import game.actions as actions
@@ -15,6 +16,13 @@ from game.actions import (
     WaitAction,
 )
 import game.color as color
+from game.commands import (
+    AutoExploreCommand,
+    MultiTurnCommand,
+    RestCommand,
+    RunCommand,
+    TravelCommand,
+)
 import game.exceptions as exceptions
 
 if TYPE_CHECKING:
@@ -52,6 +60,26 @@ MainGameEventHandler will become the active handler.
 """
 
 
+class FrozenFrame:
+    """A copy of a rendered frame, reused as long as its version stays the same."""
+
+    def __init__(self) -> None:
+        self.tiles: Optional[np.ndarray] = None
+        self.version: Any = None
+
+    def render(self, console: tcod.Console, render: Callable[[tcod.Console], None], version: Any) -> None:
+        if (
+            self.tiles is None
+            or version != self.version
+            or self.tiles.shape != console.tiles_rgb.shape
+        ):
+            render(console)
+            self.tiles = console.tiles_rgb.copy()
+            self.version = version
+        else:
+            console.tiles_rgb[...] = self.tiles
+
+
 class BaseEventHandler(tcod.event.EventDispatch[ActionOrHandler]):
     def __init__(self, animationHandler: Optional(AnimationHandler)):
         self.animationHandler = animationHandler
@@ -78,13 +106,22 @@ class PopupMessage(BaseEventHandler):
     def __init__(self, parent_handler: BaseEventHandler, text: str):
         self.parent = parent_handler
         self.text = text
+        self.background = FrozenFrame()
 
-    def on_render(self, console: tcod.Console) -> None:
-        """Render the parent and dim the result, then print the message on top."""
+    def render_background(self, console: tcod.Console) -> None:
         self.parent.on_render(console)
         console.tiles_rgb["fg"] //= 8
         console.tiles_rgb["bg"] //= 8
 
+    def on_render(self, console: tcod.Console) -> None:
+        """Render the parent and dim the result, then print the message on top."""
+        if isinstance(self.parent, EventHandler):
+            # Nothing in the game moves while the popup is up.
+            self.background.render(
+                console, self.render_background, self.parent.engine.render_version)
+        else:
+            self.render_background(console)
+
         console.print(
             console.width // 2,
             console.height // 2,
@@ -100,6 +137,12 @@ class PopupMessage(BaseEventHandler):
 
 
 class EventHandler(BaseEventHandler):
+    # Modal handlers show a window over a game which is paused while they are
+    # open, so the frame underneath is rendered once and reused until
+    # `Engine.render_version` changes.
+    modal = False
+    frozen_frame: Optional[FrozenFrame] = None
+
     def __init__(self, engine: Engine):
         self.engine = engine
 
@@ -110,13 +153,23 @@ class EventHandler(BaseEventHandler):
             return action_or_state
         if self.handle_action(action_or_state):
             # A valid action was performed.
-            if not self.engine.player.is_alive:
-                # The player was killed sometime during or after the action.
-                return GameOverEventHandler(self.engine)
-            elif self.engine.player.level.requires_level_up:
-                return LevelUpEventHandler(self.engine)
-            # Return to the main handler.
-            return MainGameEventHandler(self.engine)
+            return self.after_turn()
+        return self
+
+    def after_turn(self) -> BaseEventHandler:
+        """Return the handler to switch to after the player has taken a turn."""
+        if not self.engine.player.is_alive:
+            # The player was killed sometime during or after the action.
+            return GameOverEventHandler(self.engine)
+        elif self.engine.player.level.requires_level_up:
+            return LevelUpEventHandler(self.engine)
+        # Return to the main handler.
+        return MainGameEventHandler(self.engine)
+
+    def handle_command(self, command: MultiTurnCommand) -> BaseEventHandler:
+        """Run a multi-turn command without rendering between its turns."""
+        if command.run(self.engine):
+            return self.after_turn()
         return self
 
     def handle_action(self, action: Optional[Action]) -> bool:
@@ -128,14 +181,11 @@ class EventHandler(BaseEventHandler):
             return False
 
         try:
-            action.perform()
+            self.engine.perform_turn(action)
         except exceptions.Impossible as exc:
             self.engine.message_log.add_message(exc.args[0], color.impossible)
             return False  # Skip enemy turn on exceptions.
 
-        self.engine.handle_enemy_turns()
-
-        self.engine.update_fov()
         return True
 
     def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
@@ -143,7 +193,13 @@ class EventHandler(BaseEventHandler):
             self.engine.mouse_location = event.tile.x, event.tile.y
 
     def on_render(self, console: tcod.Console) -> None:
-        self.engine.render(console)
+        if not self.modal:
+            self.engine.render(console)
+            return
+        if self.frozen_frame is None:
+            self.frozen_frame = FrozenFrame()
+        self.frozen_frame.render(
+            console, self.engine.render, self.engine.render_version)
 
 
 class AskUserEventHandler(EventHandler):
@@ -178,6 +234,7 @@ class AskUserEventHandler(EventHandler):
 
 class CharacterScreenEventHandler(AskUserEventHandler):
     TITLE = "Character Information"
+    modal = True
 
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console)
@@ -224,6 +281,7 @@ class CharacterScreenEventHandler(AskUserEventHandler):
 
 class LevelUpEventHandler(AskUserEventHandler):
     TITLE = "Level Up"
+    modal = True
 
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console)
@@ -264,17 +322,11 @@ class LevelUpEventHandler(AskUserEventHandler):
         )
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
-        player = self.engine.player
         key = event.sym
         index = key - tcod.event.K_a
 
         if 0 <= index <= 2:
-            if index == 0:
-                player.level.increase_max_hp()
-            elif index == 1:
-                player.level.increase_power()
-            else:
-                player.level.increase_defense()
+            self.engine.level_up(index)
         else:
             self.engine.message_log.add_message(
                 "Invalid entry.", color.invalid)
@@ -299,6 +351,7 @@ class InventoryEventHandler(AskUserEventHandler):
     """
 
     TITLE = "<missing title>"
+    modal = True
 
     def on_render(self, console: tcod.Console) -> None:
         """Render an inventory menu, which displays the items in the inventory, and the letter to select them.
@@ -519,6 +572,10 @@ class MainGameEventHandler(EventHandler):
         ):
             return actions.TakeStairsAction(player)
 
+        if key in MOVE_KEYS and modifier & (
+            tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT
+        ):
+            return self.handle_command(RunCommand(*MOVE_KEYS[key]))
         if key in MOVE_KEYS:
             dx, dy = MOVE_KEYS[key]
             action = BumpAction(player, dx, dy)
@@ -532,6 +589,10 @@ class MainGameEventHandler(EventHandler):
 
         elif key == tcod.event.K_g:
             action = PickupAction(player)
+        elif key == tcod.event.K_r:
+            return self.handle_command(RestCommand())
+        elif key == tcod.event.K_x:
+            return self.handle_command(AutoExploreCommand())
 
         elif key == tcod.event.K_i:
             return InventoryActivateHandler(self.engine)
@@ -541,10 +602,26 @@ class MainGameEventHandler(EventHandler):
             return CharacterScreenEventHandler(self.engine)
         elif key == tcod.event.K_SLASH:
             return LookHandler(self.engine)
+        elif key == tcod.event.K_BACKSPACE and self.engine.rewind_buffer is not None:
+            if self.engine.rewind_buffer.rewind(self.engine, 1):
+                return self.after_turn()
+            self.engine.message_log.add_message(
+                "There is nothing to rewind.", color.impossible)
 
         # No valid key was pressed
         return action
 
+    def ev_mousebuttondown(
+        self, event: tcod.event.MouseButtonDown
+    ) -> Optional[ActionOrHandler]:
+        """Left clicking a tile on the map travels there."""
+        if event.button != 1:
+            return None
+        x, y = self.engine.camera.to_camera_coordinates(*event.tile)
+        if x is None or y is None:
+            return None
+        return self.handle_command(TravelCommand(x, y))
+
 
 class GameOverEventHandler(EventHandler):
     def on_quit(self) -> None:
@@ -572,31 +649,49 @@ CURSOR_Y_KEYS = {
 class HistoryViewer(EventHandler):
     """Print the history on a larger window which can be navigated."""
 
+    modal = True
+
     def __init__(self, engine: Engine):
         super().__init__(engine)
         self.log_length = len(engine.message_log.messages)
         self.cursor = self.log_length - 1
+        # The log window is only redrawn when the cursor moves.
+        self.log_console: Optional[tcod.Console] = None
+        self.rendered_cursor: Optional[int] = None
 
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console)  # Draw the main state as the background.
 
-        log_console = tcod.Console(console.width - 6, console.height - 6)
-
-        # Draw a frame with a custom banner title.
-        log_console.draw_frame(0, 0, log_console.width, log_console.height)
-        log_console.print_box(
-            0, 0, log_console.width, 1, "┤Message history├", alignment=tcod.CENTER
-        )
-
-        # Render the message log using the cursor parameter.
-        self.engine.message_log.render_messages(
-            log_console,
-            1,
-            1,
-            log_console.width - 2,
-            log_console.height - 2,
-            self.engine.message_log.messages[: self.cursor + 1],
-        )
+        if (
+            self.log_console is None
+            or self.log_console.width != console.width - 6
+            or self.log_console.height != console.height - 6
+        ):
+            self.log_console = tcod.Console(
+                console.width - 6, console.height - 6)
+            self.rendered_cursor = None
+        log_console = self.log_console
+
+        if self.rendered_cursor != self.cursor:
+            log_console.clear()
+            # Draw a frame with a custom banner title.
+            log_console.draw_frame(
+                0, 0, log_console.width, log_console.height)
+            log_console.print_box(
+                0, 0, log_console.width, 1, "┤Message history├", alignment=tcod.CENTER
+            )
+
+            # Render the message log using the cursor parameter.
+            self.engine.message_log.render_messages(
+                log_console,
+                1,
+                1,
+                log_console.width - 2,
+                log_console.height - 2,
+                self.engine.message_log.messages,
+                stop=self.cursor + 1,
+            )
+            self.rendered_cursor = self.cursor
         log_console.blit(console, 3, 3)
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[MainGameEventHandler]:
@@ -0,0 +1,130 @@
+"""The frames and widgets around the map, cached between frames."""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+
+from tcod.console import Console
+
+from game.game_config import ACTIONS_HEIGHT, ACTIONS_WIDTH, CAMERA_HEIGHT, CAMERA_WIDTH, \
+    LOG_HEIGHT, LOG_WIDTH, SCREEN_HEIGHT, SCREEN_WIDTH, SIDEBAR_COMPONENT_HEIGHT, SIDEBAR_WIDTH
+import game.color as color
+from game.context_info import ContextInfo
+import game.render_functions as render_functions
+
+if TYPE_CHECKING:
+    from game.engine import Engine
+
+
+class Widget:
+    """A framed area of the screen whose contents are drawn by `render_function`.
+
+    The contents are kept in their own console and only drawn again when the
+    key passed to `render` changes.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        render_function: Optional[Callable[..., None]] = None,
+    ):
+        self.label = label
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.render_function = render_function
+        self.contents: Optional[Console] = None
+        self.key: Any = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The contents are drawn again after loading.
+        state = self.__dict__.copy()
+        state["contents"] = None
+        state["key"] = None
+        return state
+
+    def render(self, console: Console, key: Any, **kwargs: Any) -> None:
+        if self.render_function is None:
+            return
+        if self.contents is None or key != self.key:
+            if self.contents is None:
+                self.contents = Console(
+                    self.width - 2, self.height - 2, order="F")
+            # Match the inside of a freshly drawn frame.
+            self.contents.clear(fg=color.light_green)
+            self.render_function(
+                console=self.contents, x=0, y=0, width=self.width - 2, height=self.height - 2, **kwargs)
+            self.key = key
+        self.contents.blit(console, self.x + 1, self.y + 1)
+
+
+class Interface:
+    """
+    The chrome of the game screen: the frame around the map and the
+    widgets around it.
+
+    Frames and labels never change, so they are drawn once into `chrome` and
+    copied to the screen with a single blit.
+    """
+
+    def __init__(self) -> None:
+        self.map_frame = Widget('GUI', 0, 0, CAMERA_WIDTH, CAMERA_HEIGHT)
+        self.diagnostic = Widget(
+            'DIAGNOSTIC', CAMERA_WIDTH, 0, SIDEBAR_WIDTH, SIDEBAR_COMPONENT_HEIGHT,
+            render_functions.render_bar,
+        )
+        self.context = Widget(
+            'CONTEXT', CAMERA_WIDTH, SIDEBAR_COMPONENT_HEIGHT, SIDEBAR_WIDTH, SIDEBAR_COMPONENT_HEIGHT,
+            render_functions.render_names,
+        )
+        self.log = Widget(
+            'LOG', 0, CAMERA_HEIGHT + ACTIONS_HEIGHT, LOG_WIDTH, LOG_HEIGHT,
+            render_functions.render_message_log,
+        )
+        self.widgets: List[Widget] = [
+            self.map_frame,
+            self.diagnostic,
+            self.context,
+            Widget('SPAWNED DAEMONS', CAMERA_WIDTH, SIDEBAR_COMPONENT_HEIGHT * 2,
+                   SIDEBAR_WIDTH, SIDEBAR_COMPONENT_HEIGHT),
+            Widget('OBJECTIVES', CAMERA_WIDTH, SIDEBAR_COMPONENT_HEIGHT * 3,
+                   SIDEBAR_WIDTH, SIDEBAR_COMPONENT_HEIGHT),
+            Widget('ACTION STACK', 0, CAMERA_HEIGHT,
+                   ACTIONS_WIDTH, ACTIONS_HEIGHT),
+            self.log,
+        ]
+        self.chrome: Optional[Console] = None
+        self.context_info = ContextInfo()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["chrome"] = None
+        return state
+
+    def render_chrome(self, console: Console) -> None:
+        """Draw the frames and labels of every widget."""
+        if self.chrome is None:
+            self.chrome = Console(SCREEN_WIDTH, SCREEN_HEIGHT, order="F")
+            for widget in self.widgets:
+                render_functions.render_frame(
+                    self.chrome, widget.label, widget.x, widget.y, widget.width, widget.height)
+        self.chrome.blit(console)
+
+    def render_widgets(self, console: Console, engine: Engine) -> None:
+        """Draw the contents of the widgets, redrawing those whose inputs changed."""
+        fighter = engine.player.fighter
+        self.diagnostic.render(
+            console,
+            (fighter.hp, fighter.max_hp),
+            current_value=fighter.hp,
+            maximum_value=fighter.max_hp,
+            total_width=20,
+        )
+        names = self.context_info.names_at_mouse(engine)
+        self.context.render(console, names, names=names)
+        message_log = engine.message_log
+        self.log.render(console, message_log.version, message_log=message_log)
@@ -1,16 +1,31 @@
-from typing import Iterable, List, Reversible, Tuple
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+import itertools
 import textwrap
 
 import tcod
 
 import game.color as color
+import game.game_config as cfg
 
 
 class Message:
     def __init__(self, text: str, fg: Tuple[int, int, int]):
         self.plain_text = text
         self.fg = fg
-        self.count = 1
+        self._count = 1
+        # Wrapped lines of `full_text` keyed by the width they were wrapped to.
+        self._wrapped: Dict[int, List[str]] = {}
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @count.setter
+    def count(self, value: int) -> None:
+        # The count is part of `full_text`, so any cached wrapping is now stale.
+        self._count = value
+        self._wrapped.clear()
 
     @property
     def full_text(self) -> str:
@@ -19,10 +34,41 @@ class Message:
             return f"{self.plain_text} (x{self.count})"
         return self.plain_text
 
+    def wrapped(self, width: int) -> List[str]:
+        """Return the lines of this message wrapped to `width`, cached per width."""
+        lines = self._wrapped.get(width)
+        if lines is None:
+            lines = self._wrapped[width] = list(
+                MessageLog.wrap(self.full_text, width))
+        return lines
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_wrapped"] = {}  # Caches are rebuilt on demand, don't save them.
+        return state
+
 
 class MessageLog:
-    def __init__(self) -> None:
-        self.messages: List[Message] = []
+    def __init__(
+        self,
+        capacity: int = cfg.MESSAGE_LOG_CAPACITY,
+        archive_path: Optional[str] = cfg.MESSAGE_LOG_ARCHIVE,
+    ) -> None:
+        """A bounded log of messages.
+
+        At most `capacity` messages are kept.  When the log is full the oldest
+        message is dropped, after being appended to `archive_path` if one is set.
+        Dropped messages are written in batches, call `flush` to write the rest.
+
+        The archive is only ever appended to, it keeps the messages of every
+        game played with it.
+        """
+        self.messages: Deque[Message] = deque(maxlen=capacity)
+        self.archive_path = archive_path
+        # Dropped messages not yet written to the archive.
+        self.pending: List[str] = []
+        # Counts changes to the log, so views of it know when to redraw.
+        self.version = 0
 
     def add_message(
         self, text: str, fg: Tuple[int, int, int] = color.white, *, stack: bool = True,
@@ -37,7 +83,31 @@ class MessageLog:
         if stack and self.messages and text == self.messages[-1].plain_text:
             self.messages[-1].count += 1
         else:
+            if len(self.messages) == self.messages.maxlen:
+                self.spill(self.messages[0])
             self.messages.append(Message(text, fg))
+        self.version += 1
+
+    def spill(self, message: Message) -> None:
+        """Queue a message which is about to be dropped for the archive file."""
+        if self.archive_path is None:
+            return
+        self.pending.append(message.full_text + "\n")
+        if len(self.pending) >= cfg.MESSAGE_LOG_ARCHIVE_BATCH:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the queued messages to the archive file."""
+        if self.archive_path is None or not self.pending:
+            return
+        with open(self.archive_path, "a", encoding="utf-8") as f:
+            f.writelines(self.pending)
+        self.pending.clear()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["pending"] = []  # Written by `flush` before saving, not saved.
+        return state
 
     def render(
         self, console: tcod.Console, x: int, y: int, width: int, height: int,
@@ -65,17 +135,26 @@ class MessageLog:
         y: int,
         width: int,
         height: int,
-        messages: Reversible[Message],
+        messages: Sequence[Message],
+        stop: Optional[int] = None,
     ) -> None:
         """Render the messages provided.
 
         The `messages` are rendered starting at the last message and working
-        backwards.
+        backwards, so only the messages which fit on screen are visited.
+
+        If `stop` is given then only `messages[:stop]` are rendered, without
+        copying the sequence.
         """
         y_offset = height - 1
 
-        for message in reversed(messages):
-            for line in reversed(list(cls.wrap(message.full_text, width))):
+        newest_first: Iterable[Message] = reversed(messages)
+        if stop is not None:
+            newest_first = itertools.islice(
+                newest_first, max(0, len(messages) - stop), None)
+
+        for message in newest_first:
+            for line in reversed(message.wrapped(width)):
                 console.print(x=x, y=y + y_offset, string=line, fg=message.fg)
                 y_offset -= 1
                 if y_offset < 0:
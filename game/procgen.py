@@ -2,12 +2,14 @@ from __future__ import annotations
 from game.camera import Camera
 
 import random
-from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING
+from typing import Dict, Iterator, List, NamedTuple, Tuple, TYPE_CHECKING
 
+import numpy as np  # type: ignore
 import tcod
 
 import game.entity_factories as entity_factories
 from game.game_map import GameMap
+from game.room_graph import RoomGraph
 import game.tile_types as tile_types
 
 
@@ -15,6 +17,10 @@ if TYPE_CHECKING:
     from game.engine import Engine
     from game.entity import Entity
 
+# Bump this whenever the same seed would generate a different floor, for
+# example after changing the code below or the spawn tables, as it is part of
+# the key of cached floors.
+GENERATOR_VERSION = 2
 
 max_items_by_floor = [
     (1, 1),
@@ -29,7 +35,8 @@ max_monsters_by_floor = [
 
 item_chances: Dict[int, List[Tuple[Entity, int]]] = {
     0: [(entity_factories.health_potion, 35)],
-    2: [(entity_factories.confusion_scroll, 10)],
+    2: [(entity_factories.confusion_scroll, 10), (entity_factories.strength_potion, 10)],
+    3: [(entity_factories.poison_cloud_scroll, 10)],
     4: [(entity_factories.lightning_scroll, 25), (entity_factories.sword, 5)],
     6: [(entity_factories.fireball_scroll, 25), (entity_factories.chain_mail, 15)],
 }
@@ -41,6 +48,27 @@ enemy_chances: Dict[int, List[Tuple[Entity, int]]] = {
     7: [(entity_factories.troll, 60)],
 }
 
+# Everything which can be spawned on a floor, by name.
+spawn_prototypes: Dict[str, Entity] = {
+    entity.name: entity
+    for chances in (item_chances, enemy_chances)
+    for entries in chances.values()
+    for entity, _ in entries
+}
+
+
+class FloorPlan(NamedTuple):
+    """The rooms, tunnels and spawns of a generated floor.
+
+    Together with the floor's tiles this is enough to build the floor again
+    without generating it, see `build_dungeon`.
+    """
+    start: Tuple[int, int]
+    downstairs: Tuple[int, int]
+    rooms: List[Tuple[int, int, int, int]]  # (x, y, width, height)
+    tunnels: List[List[Tuple[int, int]]]
+    spawns: List[Tuple[str, int, int]]  # (name, x, y) in the order spawned.
+
 
 def get_max_value_for_floor(
     max_value_by_floor: List[Tuple[int, int]], floor: int
@@ -60,6 +88,7 @@ def get_entities_at_random(
     weighted_chances_by_floor: Dict[int, List[Tuple[Entity, int]]],
     number_of_entities: int,
     floor: int,
+    rng: random.Random,
 ) -> List[Entity]:
     entity_weighted_chances = {}
 
@@ -76,7 +105,7 @@ def get_entities_at_random(
     entities = list(entity_weighted_chances.keys())
     entity_weighted_chance_values = list(entity_weighted_chances.values())
 
-    chosen_entities = random.choices(
+    chosen_entities = rng.choices(
         entities, weights=entity_weighted_chance_values, k=number_of_entities
     )
 
@@ -112,36 +141,42 @@ class RectangularRoom:
         )
 
 
-def place_entities(room: RectangularRoom, dungeon: GameMap, floor_number: int,) -> None:
-    number_of_monsters = random.randint(
+def place_entities(
+    room: RectangularRoom, dungeon: GameMap, floor_number: int, rng: random.Random,
+) -> List[Tuple[str, int, int]]:
+    """Spawn monsters and items in `room`, return what was spawned where."""
+    number_of_monsters = rng.randint(
         0, get_max_value_for_floor(max_monsters_by_floor, floor_number)
     )
-    number_of_items = random.randint(
+    number_of_items = rng.randint(
         0, get_max_value_for_floor(max_items_by_floor, floor_number)
     )
 
     monsters: List[Entity] = get_entities_at_random(
-        enemy_chances, number_of_monsters, floor_number
+        enemy_chances, number_of_monsters, floor_number, rng
     )
     items: List[Entity] = get_entities_at_random(
-        item_chances, number_of_items, floor_number
+        item_chances, number_of_items, floor_number, rng
     )
 
+    spawned = []
     for entity in monsters + items:
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
+        x = rng.randint(room.x1 + 1, room.x2 - 1)
+        y = rng.randint(room.y1 + 1, room.y2 - 1)
 
         if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
             entity.spawn(dungeon, x, y)
+            spawned.append((entity.name, x, y))
+    return spawned
 
 
 def tunnel_between(
-    start: Tuple[int, int], end: Tuple[int, int]
+    start: Tuple[int, int], end: Tuple[int, int], rng: random.Random,
 ) -> Iterator[Tuple[int, int]]:
     """Return an L-shaped tunnel between these two points."""
     x1, y1 = start
     x2, y2 = end
-    if random.random() < 0.5:  # 50% chance.
+    if rng.random() < 0.5:  # 50% chance.
         # Move horizontally, then vertically.
         corner_x, corner_y = x2, y1
     else:
@@ -164,22 +199,31 @@ def generate_dungeon(
     engine: Engine,
     camera: Camera,
 ) -> GameMap:
-    """Generate a new dungeon map."""
+    """Generate a new dungeon map.
+
+    The layout and what spawns on it are drawn from their own streams for the
+    current floor, so a seed always gives the same floor.
+    """
+    floor_number = engine.game_world.current_floor
+    layout_rng = engine.rng.floor("map", floor_number)
+    spawn_rng = engine.rng.floor("spawn", floor_number)
     player = engine.player
     dungeon = GameMap(engine, map_width, map_height, camera, entities=[player])
     camera.map_width = map_width
     camera.map_height = map_height
 
     rooms: List[RectangularRoom] = []
+    tunnels: List[List[Tuple[int, int]]] = []
+    spawns: List[Tuple[str, int, int]] = []
 
     center_of_last_room = (0, 0)
 
     for r in range(max_rooms):
-        room_width = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
+        room_width = layout_rng.randint(room_min_size, room_max_size)
+        room_height = layout_rng.randint(room_min_size, room_max_size)
 
-        x = random.randint(0, dungeon.width - room_width - 1)
-        y = random.randint(0, dungeon.height - room_height - 1)
+        x = layout_rng.randint(0, dungeon.width - room_width - 1)
+        y = layout_rng.randint(0, dungeon.height - room_height - 1)
 
         # "RectangularRoom" class makes rectangles easier to work with
         new_room = RectangularRoom(x, y, room_width, room_height)
@@ -198,12 +242,15 @@ def generate_dungeon(
             camera.center_on(*new_room.center)
         else:  # All rooms after the first.
             # Dig out a tunnel between this room and the previous one.
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
+            tunnel = list(tunnel_between(
+                rooms[-1].center, new_room.center, layout_rng))
+            for x, y in tunnel:
                 dungeon.tiles[x, y] = tile_types.floor
+            tunnels.append(tunnel)
 
             center_of_last_room = new_room.center
 
-        place_entities(new_room, dungeon, engine.game_world.current_floor)
+        spawns += place_entities(new_room, dungeon, floor_number, spawn_rng)
 
         dungeon.tiles[center_of_last_room] = tile_types.down_stairs
         dungeon.downstairs_location = center_of_last_room
@@ -211,4 +258,43 @@ def generate_dungeon(
         # Finally, append the new room to the list.
         rooms.append(new_room)
 
+    dungeon.room_graph = RoomGraph.build(
+        dungeon.width, dungeon.height, rooms, tunnels)
+    dungeon.plan = FloorPlan(
+        start=(player.x, player.y),
+        downstairs=dungeon.downstairs_location,
+        rooms=[(room.x1, room.y1, room.x2 - room.x1, room.y2 - room.y1)
+               for room in rooms],
+        tunnels=tunnels,
+        spawns=spawns,
+    )
+
+    return dungeon
+
+
+def build_dungeon(
+    tiles: np.ndarray,
+    plan: FloorPlan,
+    engine: Engine,
+    camera: Camera,
+) -> GameMap:
+    """Build a floor from the tiles and plan of a floor generated earlier."""
+    player = engine.player
+    map_width, map_height = tiles.shape
+    dungeon = GameMap(engine, map_width, map_height, camera, entities=[player])
+    camera.map_width = map_width
+    camera.map_height = map_height
+
+    dungeon.tiles[...] = tiles
+    player.place(*plan.start, dungeon)
+    camera.center_on(*plan.start)
+    for name, x, y in plan.spawns:
+        spawn_prototypes[name].spawn(dungeon, x, y)
+    dungeon.downstairs_location = plan.downstairs
+
+    rooms = [RectangularRoom(*room) for room in plan.rooms]
+    dungeon.room_graph = RoomGraph.build(
+        map_width, map_height, rooms, plan.tunnels)
+    dungeon.plan = plan
+
     return dungeon
@@ -0,0 +1,194 @@
+"""Per-phase timing of the main loop, with an in-game overlay and trace export."""
+from __future__ import annotations
+
+import contextlib
+import csv
+import json
+import time
+from collections import deque
+from typing import ContextManager, Deque, Dict, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+import tcod
+
+import game.color as color
+import game.game_config as cfg
+
+# The phases timed by the main loop, in the order they are shown in the overlay.
+# "events" is the handling of input without the turns it performs, which are
+# timed by the phases nested in it.
+PHASES = (
+    "events",
+    "perform",
+    "enemy_turns",
+    "update_fov",
+    "render",
+    "animation",
+    "present",
+)
+
+TOGGLE_OVERLAY_KEY = tcod.event.K_F3
+DUMP_TRACE_KEY = tcod.event.K_F4
+
+# Shared no-op context manager returned while profiling is disabled, so an
+# untimed phase costs one attribute check and no allocation.
+_DISABLED = contextlib.nullcontext()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.profiler.nested.append(0.0)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        duration = time.perf_counter() - self.start
+        nested = self.profiler.nested
+        inner = nested.pop()
+        if nested:
+            nested[-1] += duration
+        self.profiler.record(self.name, self.start, duration - inner)
+
+
+class Profiler:
+    """
+    Collects phase timings for the last `window` frames of each phase, and a
+    bounded trace of every timed phase for export.
+
+    Phases are timed exclusively, time spent in a phase nested inside another
+    one only counts towards the inner phase.  A phase timed several times in
+    one frame, like the turns of a multi-turn command, adds up to one sample
+    for that frame.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        window: int = cfg.PROFILER_WINDOW,
+        trace_limit: int = cfg.PROFILER_TRACE_LIMIT,
+    ):
+        self.enabled = enabled
+        self.overlay_visible = False
+        self.frame = 0
+        self.window = window
+        self.samples: Dict[str, Deque[float]] = {
+            name: deque(maxlen=window) for name in PHASES
+        }
+        # Time of each phase so far this frame.
+        self.frame_totals: Dict[str, float] = {}
+        # Time spent in the phases nested in each phase being timed.
+        self.nested: List[float] = []
+        # (frame, phase, start, duration) with times in seconds.
+        self.trace: Deque[Tuple[int, str, float, float]
+                          ] = deque(maxlen=trace_limit)
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """Return a context manager which times the `name` phase."""
+        if not self.enabled:
+            return _DISABLED
+        return _Phase(self, name)
+
+    def record(self, name: str, start: float, duration: float) -> None:
+        self.frame_totals[name] = self.frame_totals.get(name, 0.0) + duration
+        self.trace.append((self.frame, name, start, duration))
+
+    def next_frame(self) -> None:
+        """End the frame, the time of each phase in it becomes one sample."""
+        if not self.enabled:
+            return
+        for name, duration in self.frame_totals.items():
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+            self.samples[name].append(duration)
+        self.frame_totals.clear()
+        self.frame += 1
+
+    def percentiles(self, name: str) -> Optional[Tuple[float, float, float]]:
+        """Return the rolling p50, p95 and p99 of a phase in seconds."""
+        samples = self.samples.get(name)
+        if not samples:
+            return None
+        p50, p95, p99 = np.percentile(
+            np.fromiter(samples, dtype=np.float64, count=len(samples)),
+            (50, 95, 99),
+        )
+        return float(p50), float(p95), float(p99)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for name in self.samples:
+            stats = self.percentiles(name)
+            if stats is not None:
+                summary[name] = dict(zip(("p50", "p95", "p99"), stats))
+        return summary
+
+    def toggle_overlay(self) -> None:
+        """Show or hide the overlay, showing it also turns profiling on."""
+        self.overlay_visible = not self.overlay_visible
+        if self.overlay_visible:
+            self.enabled = True
+
+    def handle_event(self, event: tcod.event.Event) -> bool:
+        """Handle the profiler hotkeys.  Returns True if the event was used."""
+        if not isinstance(event, tcod.event.KeyDown):
+            return False
+        if event.sym == TOGGLE_OVERLAY_KEY:
+            self.toggle_overlay()
+            return True
+        if event.sym == DUMP_TRACE_KEY and self.enabled:
+            self.dump(cfg.PROFILER_TRACE_FILE)
+            return True
+        return False
+
+    def render(self, console: tcod.Console) -> None:
+        """Draw the timing overlay in the top right corner of the console."""
+        if not self.overlay_visible:
+            return
+        lines: List[str] = [f"{'phase':<12}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for name in self.samples:
+            stats = self.percentiles(name)
+            if stats is None:
+                continue
+            lines.append(
+                f"{name:<12}" + "".join(f"{s * 1000:>7.2f}" for s in stats))
+        width = max(len(line) for line in lines) + 2
+        height = len(lines) + 2
+        x = console.width - width
+        console.draw_frame(
+            x, 0, width, height, title="ms", clear=True, fg=color.light_yellow, bg=color.black)
+        for i, line in enumerate(lines):
+            console.print(x + 1, i + 1, line, fg=color.white, bg=color.black)
+
+    def dump(self, basename: str) -> None:
+        """Write the trace to `basename`.csv and the summary and trace to `basename`.json."""
+        self.dump_csv(f"{basename}.csv")
+        self.dump_json(f"{basename}.json")
+
+    def dump_csv(self, filename: str) -> None:
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame", "phase", "start", "duration"))
+            writer.writerows(self.trace)
+
+    def dump_json(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(
+                {
+                    "summary": self.summary(),
+                    "trace": [
+                        {"frame": frame, "phase": name,
+                            "start": start, "duration": duration}
+                        for frame, name, start, duration in self.trace
+                    ],
+                },
+                f,
+            )
+
+
+profiler = Profiler(enabled=cfg.PROFILE)
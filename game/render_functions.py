@@ -9,6 +9,7 @@ if TYPE_CHECKING:
     from tcod import Console
     from game.engine import Engine
     from game.game_map import GameMap
+    from game.message_log import MessageLog
 
 
 def get_names_at_location(x: int, y: int, game_map: GameMap) -> str:
@@ -20,10 +21,13 @@ def get_names_at_location(x: int, y: int, game_map: GameMap) -> str:
     if not game_map.in_bounds(x, y) or not game_map.visible[adj_x, adj_y]:
         return ""
 
-    names = ", ".join(
-        entity.name for entity in game_map.entities if entity.x == adj_x and entity.y == adj_y)
+    names = [
+        entity.name for entity in game_map.entities if entity.x == adj_x and entity.y == adj_y]
+    corpse = game_map.corpse_at(adj_x, adj_y)
+    if corpse is not None:
+        names.append(corpse)
 
-    return names.capitalize()
+    return ", ".join(names).capitalize()
 
 
 def render_bar(
@@ -63,7 +67,17 @@ def render_names_at_mouse_location(
         x=mouse_x, y=mouse_y, game_map=engine.game_map
     )
 
-    console.print(x=x, y=y, string=names_at_mouse_location)
+    render_names(console=console, x=x, y=y, names=names_at_mouse_location)
+
+
+def render_names(console: Console, x: int, y: int, names: str, *args, **kwargs) -> None:
+    console.print(x=x, y=y, string=names)
+
+
+def render_message_log(
+    console: Console, x: int, y: int, width: int, height: int, message_log: MessageLog, *args, **kwargs,
+) -> None:
+    message_log.render(console=console, x=x, y=y, width=width, height=height)
 
 
 def render_frame(console: Console, label: str, x: int, y: int, width: int, height: int) -> None:
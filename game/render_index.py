@@ -0,0 +1,201 @@
+"""The glyphs of a map's entities, kept in arrays so they can be drawn in bulk."""
+from __future__ import annotations
+
+import itertools
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+from game.render_order import RenderOrder
+
+if TYPE_CHECKING:
+    from game.entity import Entity
+
+Chunk = Tuple[int, int]
+CHUNK_SIZE = 16  # Width and height of the areas rows are grouped by.
+
+
+def chunk_of(x: int, y: int) -> Chunk:
+    return x // CHUNK_SIZE, y // CHUNK_SIZE
+
+
+class RenderBucket:
+    """The position, character and color of each entity of one render order.
+
+    Rows are kept packed, removing an entity moves the last row into its place.
+    The rows are also grouped by the chunk of the map they are in, so the rows
+    in an area can be found without looking at the others.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self.count = 0
+        self.xs = np.zeros(capacity, dtype=np.int32)
+        self.ys = np.zeros(capacity, dtype=np.int32)
+        self.chs = np.zeros(capacity, dtype=np.int32)
+        self.fgs = np.zeros((capacity, 3), dtype=np.uint8)
+        self.entities: List[Entity] = []
+        # How many entities stand on each tile, tiles without any are left out.
+        self.tiles: Dict[Tuple[int, int], int] = {}
+        # The rows in each chunk, used as ordered sets.  Empty chunks are left out.
+        self.chunks: Dict[Chunk, Dict[int, None]] = {}
+
+    def enter(self, row: int, x: int, y: int) -> None:
+        self.tiles[x, y] = self.tiles.get((x, y), 0) + 1
+        self.chunks.setdefault(chunk_of(x, y), {})[row] = None
+
+    def leave(self, row: int, x: int, y: int) -> None:
+        if self.tiles[x, y] == 1:
+            del self.tiles[x, y]
+        else:
+            self.tiles[x, y] -= 1
+        chunk = chunk_of(x, y)
+        rows = self.chunks[chunk]
+        del rows[row]
+        if not rows:
+            del self.chunks[chunk]
+
+    def rows_in(self, x1: int, y1: int, x2: int, y2: int) -> Optional[np.ndarray]:
+        """Return the rows in the chunks overlapping the area from (x1, y1) to
+        (x2, y2) exclusive, in order.  Returns None if that is every row."""
+        cx1, cy1 = chunk_of(x1, y1)
+        cx2, cy2 = chunk_of(x2 - 1, y2 - 1)
+        groups = [
+            rows for rows in (
+                self.chunks.get(chunk)
+                for chunk in itertools.product(range(cx1, cx2 + 1), range(cy1, cy2 + 1)))
+            if rows
+        ]
+        total = sum(len(rows) for rows in groups)
+        if total == self.count:
+            return None
+        found = np.fromiter(itertools.chain.from_iterable(groups), dtype=np.intp, count=total)
+        found.sort()  # Later rows are drawn over earlier ones, as when drawing every row.
+        return found
+
+    def grow(self) -> None:
+        capacity = len(self.xs) * 2
+        for name in ("xs", "ys", "chs", "fgs"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, entity: Entity) -> int:
+        if self.count == len(self.xs):
+            self.grow()
+        row = self.count
+        self.xs[row] = entity.x
+        self.ys[row] = entity.y
+        self.chs[row] = ord(entity.char)
+        self.fgs[row] = entity.color
+        self.entities.append(entity)
+        self.enter(row, entity.x, entity.y)
+        self.count += 1
+        return row
+
+    def remove(self, row: int) -> None:
+        self.leave(row, int(self.xs[row]), int(self.ys[row]))
+        last = self.count - 1
+        if row != last:
+            # The last row moves into the gap.
+            rows = self.chunks[chunk_of(int(self.xs[last]), int(self.ys[last]))]
+            del rows[last]
+            rows[row] = None
+        for column in (self.xs, self.ys, self.chs, self.fgs):
+            column[row] = column[last]
+        self.entities[row] = self.entities[last]
+        self.entities.pop()
+        self.count = last
+
+
+class RenderIndex:
+    """
+    Keeps the glyphs of every entity on a map in one `RenderBucket` per
+    `RenderOrder`, so a frame is drawn with one scatter per bucket.
+
+    The map tells the index whenever an entity is added, removed, moved or
+    changes its look.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: Dict[RenderOrder, RenderBucket] = {
+            order: RenderBucket() for order in sorted(RenderOrder, key=lambda order: order.value)
+        }
+        self.rows: Dict[Entity, Tuple[RenderOrder, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, entity: Entity) -> None:
+        if entity in self.rows:
+            self.remove(entity)  # Adding again refreshes everything about it.
+        order = entity.render_order
+        self.rows[entity] = order, self.buckets[order].add(entity)
+
+    def remove(self, entity: Entity) -> None:
+        position = self.rows.pop(entity, None)
+        if position is None:
+            return
+        order, row = position
+        bucket = self.buckets[order]
+        bucket.remove(row)
+        if row < bucket.count:
+            self.rows[bucket.entities[row]] = order, row
+
+    def moved(self, entity: Entity) -> None:
+        position = self.rows.get(entity)
+        if position is None:
+            return
+        bucket = self.buckets[position[0]]
+        row = position[1]
+        bucket.leave(row, int(bucket.xs[row]), int(bucket.ys[row]))
+        bucket.xs[row] = entity.x
+        bucket.ys[row] = entity.y
+        bucket.enter(row, entity.x, entity.y)
+
+    def changed(self, entity: Entity) -> None:
+        """Update the character, color and render order of `entity`."""
+        if entity in self.rows:
+            self.add(entity)
+
+    def any_at(self, order: RenderOrder, x: int, y: int) -> bool:
+        """Return True if an entity of `order` is at (x, y)."""
+        return (x, y) in self.buckets[order].tiles
+
+    def visible_in(
+        self, order: RenderOrder, visible: np.ndarray, window: Tuple[slice, slice],
+    ) -> List[Entity]:
+        """Return the entities of `order` on visible tiles inside `window`,
+        the area of the map's `fov_window`."""
+        bucket = self.buckets[order]
+        n = bucket.count
+        xs, ys = bucket.xs[:n], bucket.ys[:n]
+        x_window, y_window = window
+        rows = np.flatnonzero(
+            (xs >= x_window.start) & (xs < x_window.stop)
+            & (ys >= y_window.start) & (ys < y_window.stop))
+        rows = rows[visible[xs[rows], ys[rows]]]
+        return [bucket.entities[row] for row in rows.tolist()]
+
+    def draw(self, tiles: np.ndarray, visible: np.ndarray, x: int, y: int) -> None:
+        """Draw the visible entities into `tiles`, a console's `tiles_rgb`
+        showing the map from (x, y) on.
+
+        `visible` is the map's visibility array.  Only the rows in the chunks
+        under `tiles` are looked at.
+        """
+        width, height = tiles.shape
+        for bucket in self.buckets.values():
+            if not bucket.count:
+                continue
+            rows: object = bucket.rows_in(x, y, x + width, y + height)
+            if rows is None:
+                rows = slice(0, bucket.count)
+            map_xs, map_ys = bucket.xs[rows], bucket.ys[rows]
+            xs = map_xs - x
+            ys = map_ys - y
+            shown = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            shown[shown] = visible[map_xs[shown], map_ys[shown]]
+            xs, ys = xs[shown], ys[shown]
+            tiles["ch"][xs, ys] = bucket.chs[rows][shown]
+            tiles["fg"][xs, ys] = bucket.fgs[rows][shown]
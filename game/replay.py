@@ -0,0 +1,300 @@
+"""Recording of the player's actions and replaying them without a window.
+
+A recording starts with the game's seed followed by one record per turn the
+player took, every `cfg.REPLAY_CHECKSUM_INTERVAL` turns a checksum of the game
+state is added so that a replay which goes differently is caught close to
+where it went wrong.
+
+    python -m game.replay session.rec --dump-turns 10,200 --dump-dir frames
+    python -m game.replay session.rec --spectate unix:/tmp/game.sock --turn-delay 0.1
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import game.actions as actions
+import game.game_config as cfg
+
+if TYPE_CHECKING:
+    from game.engine import Engine
+
+MAGIC = b"URHR"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBq")  # Magic, format version, seed.
+
+# Opcodes, each is followed by the payload listed next to it.
+WAIT = 0
+BUMP = 1  # dx, dy
+MOVE = 2  # dx, dy
+MELEE = 3  # dx, dy
+PICKUP = 4
+TAKE_STAIRS = 5
+USE_ITEM = 6  # Inventory index, target x, target y
+DROP_ITEM = 7  # Inventory index
+EQUIP = 8  # Inventory index
+LEVEL_UP = 9  # Choice, see `Engine.level_up`
+CHECKSUM = 10  # Turn, CRC-32 of `checksum`
+REST = 11
+
+PAYLOADS = {
+    WAIT: struct.Struct("<"),
+    BUMP: struct.Struct("<bb"),
+    MOVE: struct.Struct("<bb"),
+    MELEE: struct.Struct("<bb"),
+    PICKUP: struct.Struct("<"),
+    TAKE_STAIRS: struct.Struct("<"),
+    USE_ITEM: struct.Struct("<BHH"),
+    DROP_ITEM: struct.Struct("<B"),
+    EQUIP: struct.Struct("<B"),
+    LEVEL_UP: struct.Struct("<B"),
+    CHECKSUM: struct.Struct("<II"),
+    REST: struct.Struct("<"),
+}
+
+# Exact action classes, subclasses get their own opcodes.
+DIRECTIONS = {actions.BumpAction: BUMP, actions.MovementAction: MOVE, actions.MeleeAction: MELEE}
+
+
+class ReplayDiverged(Exception):
+    """Raised when a replay no longer matches its recording.
+
+    The reason is given as the exception message.
+    """
+
+
+def checksum(engine: Engine) -> int:
+    """Return a CRC-32 of the state a replay has to reproduce."""
+    player = engine.player
+    actors = sorted(
+        (actor.x, actor.y, actor.name, actor.fighter.hp)
+        for actor in engine.game_map.actors
+    )
+    state = repr((
+        engine.game_world.current_floor,
+        player.x,
+        player.y,
+        player.fighter.hp,
+        player.fighter.max_hp,
+        player.level.current_xp,
+        [item.name for item in player.inventory.items],
+        actors,
+        engine.rng.stream("ai").getstate(),
+    ))
+    return zlib.crc32(state.encode())
+
+
+class Recorder:
+    """Records the player's actions as they are performed, see `Engine.perform_turn`.
+
+    The records are kept in memory and are saved with the game, so that a
+    recording covers a whole session even across saves.
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.data = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, seed))
+        self.turns = 0
+
+    def encode(self, action: actions.Action) -> bytes:
+        """Return the record of `action`, which the player is about to perform."""
+        kind = type(action)
+        if kind in DIRECTIONS:
+            return self.pack(DIRECTIONS[kind], action.dx, action.dy)
+        if kind is actions.WaitAction:
+            return self.pack(WAIT)
+        if kind is actions.RestAction:
+            return self.pack(REST)
+        if kind is actions.PickupAction:
+            return self.pack(PICKUP)
+        if kind is actions.TakeStairsAction:
+            return self.pack(TAKE_STAIRS)
+        items = action.entity.inventory.items
+        if kind is actions.ItemAction:
+            return self.pack(USE_ITEM, items.index(action.item), *action.target_xy)
+        if kind is actions.DropItem:
+            return self.pack(DROP_ITEM, items.index(action.item))
+        if kind is actions.EquipAction:
+            return self.pack(EQUIP, items.index(action.item))
+        raise TypeError(f"Can't record a {kind.__name__}.")
+
+    @staticmethod
+    def pack(opcode: int, *payload: int) -> bytes:
+        return bytes((opcode,)) + PAYLOADS[opcode].pack(*payload)
+
+    def record_turn(self, record: bytes, engine: Engine) -> None:
+        """Add the record of a turn which was performed."""
+        self.data += record
+        self.turns += 1
+        if self.turns % cfg.REPLAY_CHECKSUM_INTERVAL == 0:
+            self.data += self.pack(CHECKSUM, self.turns, checksum(engine))
+
+    def record_level_up(self, choice: int) -> None:
+        self.data += self.pack(LEVEL_UP, choice)
+
+    def save(self, filename: str) -> None:
+        with open(filename, "wb") as f:
+            f.write(self.data)
+
+
+def read_recording(data: bytes) -> Tuple[int, Iterator[Tuple[int, Tuple[int, ...]]]]:
+    """Return the seed of a recording and an iterator of its (opcode, payload) records."""
+    magic, version, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a recording made by this version of the game.")
+
+    def records() -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        offset = HEADER.size
+        while offset < len(data):
+            opcode = data[offset]
+            payload = PAYLOADS[opcode]
+            yield opcode, payload.unpack_from(data, offset + 1)
+            offset += 1 + payload.size
+    return seed, records()
+
+
+def decode(engine: Engine, opcode: int, payload: Tuple[int, ...]) -> actions.Action:
+    """Return the action for a record of a player's turn."""
+    player = engine.player
+    if opcode == BUMP:
+        return actions.BumpAction(player, *payload)
+    if opcode == MOVE:
+        return actions.MovementAction(player, *payload)
+    if opcode == MELEE:
+        return actions.MeleeAction(player, *payload)
+    if opcode == WAIT:
+        return actions.WaitAction(player)
+    if opcode == REST:
+        return actions.RestAction(player)
+    if opcode == PICKUP:
+        return actions.PickupAction(player)
+    if opcode == TAKE_STAIRS:
+        return actions.TakeStairsAction(player)
+    item = player.inventory.items[payload[0]]
+    if opcode == USE_ITEM:
+        return actions.ItemAction(player, item, (payload[1], payload[2]))
+    if opcode == DROP_ITEM:
+        return actions.DropItem(player, item)
+    if opcode == EQUIP:
+        return actions.EquipAction(player, item)
+    raise ValueError(f"Unknown opcode {opcode}.")
+
+
+def dump_frame(engine: Engine, filename: str) -> None:
+    """Write what the screen shows as text and as an array of its tiles."""
+    from tcod.console import Console
+
+    console = Console(cfg.SCREEN_WIDTH, cfg.SCREEN_HEIGHT, order="F")
+    engine.render(console)
+    np.save(filename + ".npy", console.tiles_rgb)
+    with open(filename + ".txt", "w", encoding="utf-8") as f:
+        f.write(str(console))
+
+
+def replay(
+    data: bytes,
+    dump_turns: Sequence[int] = (),
+    dump_dir: str = ".",
+    on_turn: Optional[Callable[[Engine, int], None]] = None,
+) -> Tuple[Engine, int]:
+    """Replay a recording as fast as possible.
+
+    Returns the engine it ends with and the number of turns replayed.
+    Frames are dumped to `dump_dir` after each turn in `dump_turns`, and
+    `on_turn` is called with the engine and turn after every turn.  Raises
+    ReplayDiverged if the game stops matching the recording.
+    """
+    import game.exceptions as exceptions
+    import game.setup_game as setup_game
+
+    seed, records = read_recording(data)
+    engine = setup_game.new_game(seed=seed)
+    engine.recorder = None  # Checksums are computed as they're needed.
+    engine.message_log.archive_path = None  # The player's archive isn't touched.
+    dumps = set(dump_turns)
+    turns = 0
+    for opcode, payload in records:
+        if opcode == CHECKSUM:
+            if payload != (turns, checksum(engine)):
+                raise ReplayDiverged(f"The game diverged by turn {turns}.")
+            continue
+        if opcode == LEVEL_UP:
+            engine.level_up(payload[0])
+            continue
+        try:
+            engine.perform_turn(decode(engine, opcode, payload))
+        except (exceptions.Impossible, IndexError) as exc:
+            raise ReplayDiverged(
+                f"Turn {turns + 1} could not be replayed: {exc}") from exc
+        turns += 1
+        if turns in dumps:
+            dump_frame(engine, os.path.join(dump_dir, f"turn_{turns:06d}"))
+        if on_turn is not None:
+            on_turn(engine, turns)
+    return engine, turns
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m game.replay", description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="a recording, see cfg.RECORDING_FILE")
+    parser.add_argument(
+        "--dump-turns", default="",
+        help="comma separated turns after which to dump the screen")
+    parser.add_argument("--dump-dir", default=".",
+                        help="where to dump the screens")
+    parser.add_argument(
+        "--spectate", metavar="ADDRESS",
+        help="stream the replay to spectators, see `python -m game.spectator`")
+    parser.add_argument("--turn-delay", type=float, default=0.1,
+                        help="seconds between turns when spectating")
+    args = parser.parse_args(argv)
+
+    with open(args.recording, "rb") as f:
+        data = f.read()
+    dump_turns = [int(turn) for turn in args.dump_turns.split(",") if turn]
+    if dump_turns:
+        os.makedirs(args.dump_dir, exist_ok=True)
+
+    on_turn = spectators = None
+    if args.spectate:
+        from tcod.console import Console
+        from game.spectator import SpectatorServer, parse_address
+
+        spectators = SpectatorServer(parse_address(args.spectate))
+        spectators.start()
+        console = Console(cfg.SCREEN_WIDTH, cfg.SCREEN_HEIGHT, order="F")
+
+        def on_turn(engine: Engine, turn: int) -> None:
+            console.clear()
+            engine.render(console)
+            spectators.publish(console)
+            time.sleep(args.turn_delay)
+
+    start = time.perf_counter()
+    try:
+        engine, turns = replay(data, dump_turns, args.dump_dir, on_turn)
+    except ReplayDiverged as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        if spectators is not None:
+            spectators.close()
+    elapsed = time.perf_counter() - start
+    print(
+        f"Replayed {turns} turns in {elapsed:.2f} s ({turns / max(elapsed, 1e-9):.0f} turns/s), "
+        f"ending on floor {engine.game_world.current_floor} "
+        f"with {engine.player.fighter.hp} HP."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
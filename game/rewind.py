@@ -0,0 +1,345 @@
+"""Stepping the game back by turns, from what each turn changed."""
+from __future__ import annotations
+
+import random
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import game.game_config as cfg
+from components.base_component import BaseComponent
+
+if TYPE_CHECKING:
+    from game.engine import Engine
+    from game.game_map import GameMap
+
+# Arrays of the map kept as sparse diffs rather than in the field snapshots.
+MAP_ARRAYS = ("tiles", "visible", "explored", "corpses")
+
+# Fields which are not rewound, by class name.  They are either caches which
+# are rebuilt afterwards, never change, or must keep counting up.
+UNTRACKED: Dict[str, frozenset] = {
+    "Engine": frozenset(("mouse_location", "interface", "rewind_buffer")),
+    "GameMap": frozenset(MAP_ARRAYS + (
+        "engine", "camera", "width", "height", "version", "render_index",
+        "room_graph", "plan", "scheduler", "activity", "explore_map")),
+    "MessageLog": frozenset(("version", "archive_path", "pending")),
+    "Message": frozenset(("_wrapped",)),
+}
+NOTHING: frozenset = frozenset()
+MISSING = object()
+
+
+# Frozen copies of mutable field values, restored in place into the current value.
+class FrozenList(tuple):
+    pass
+
+
+class FrozenDeque(tuple):
+    pass
+
+
+class FrozenDict(tuple):
+    """The (key, frozen value) items of a dict, in order."""
+
+
+class FrozenArray(tuple):
+    """(bytes, dtype, shape) of a small array."""
+
+
+class Length(int):
+    """The length of a bytearray which is only ever appended to."""
+
+
+def freeze_dict(value: dict) -> FrozenDict:
+    return FrozenDict((key, freeze(item)) for key, item in value.items())
+
+
+FREEZERS: Dict[type, Callable[[Any], Any]] = {
+    list: FrozenList,
+    deque: FrozenDeque,
+    dict: freeze_dict,
+    bytearray: lambda value: Length(len(value)),
+    np.ndarray: lambda value: FrozenArray((value.tobytes(), value.dtype, value.shape)),
+}
+
+
+def freeze(value: Any) -> Any:
+    freezer = FREEZERS.get(type(value))
+    return value if freezer is None else freezer(value)
+
+
+def thaw(value: Any) -> Any:
+    kind = type(value)
+    if kind is FrozenList:
+        return list(value)
+    if kind is FrozenDict:
+        return {key: thaw(item) for key, item in value}
+    if kind is FrozenArray:
+        data, dtype, shape = value
+        return np.frombuffer(data, dtype=dtype).reshape(shape).copy()
+    return value
+
+
+def snapshot(obj: Any) -> Dict[str, Any]:
+    """Return the state of an object's fields which a turn may change."""
+    if isinstance(obj, random.Random):
+        return {"state": obj.getstate()}
+    untracked = UNTRACKED.get(type(obj).__name__, NOTHING)
+    return {
+        name: freeze(value)
+        for name, value in vars(obj).items() if name not in untracked
+    }
+
+
+def restore(obj: Any, fields: Dict[str, Any]) -> None:
+    """Set the given fields of `obj` back to their frozen values."""
+    if isinstance(obj, random.Random):
+        obj.setstate(fields["state"])
+        return
+    values = vars(obj)
+    for name, old in fields.items():
+        if old is MISSING:
+            values.pop(name, None)
+            continue
+        current = values.get(name)
+        kind = type(old)
+        # Containers are restored in place, other objects may refer to them.
+        if kind is FrozenList and type(current) is list:
+            current[:] = old
+        elif kind is FrozenDeque and type(current) is deque:
+            current.clear()
+            current.extend(old)
+        elif kind is FrozenDict and type(current) is dict:
+            current.clear()
+            current.update(thaw(old))
+        elif kind is Length:
+            del current[old:]
+        else:
+            values[name] = thaw(old)
+
+
+def raw(array: np.ndarray) -> np.ndarray:
+    """View each cell as bytes, comparing structured cells field by field is slow."""
+    return array.view(np.dtype((np.void, array.dtype.itemsize)))
+
+
+def tracked_objects(engine: Engine) -> Iterator[Any]:
+    """Yield every object whose fields a turn may change."""
+    game_map = engine.game_map
+    yield from (
+        engine, game_map, engine.game_world, game_map.scheduler, game_map.activity,
+        engine.status_effects, engine.message_log, engine.actor_pool, engine.camera,
+    )
+    if engine.recorder is not None:
+        yield engine.recorder
+    yield from engine.rng.streams.values()
+    if engine.message_log.messages:
+        yield engine.message_log.messages[-1]  # Its count goes up in place.
+    for entity in (*game_map.entities, *engine.player.inventory.items):
+        yield entity
+        for value in vars(entity).values():
+            # Components, and the AI which refers to its entity instead.
+            if isinstance(value, BaseComponent) or getattr(value, "entity", None) is entity:
+                yield value
+                yield from getattr(value, "modifiers", ())
+
+
+class TurnDelta(NamedTuple):
+    """How to undo one turn."""
+    game_map: GameMap  # The map `arrays` belong to.
+    arrays: List[Tuple[str, Tuple[np.ndarray, ...], np.ndarray]]  # (name, indices, old values)
+    objects: List[Tuple[Any, Dict[str, Any]]]  # (object, old values of changed fields)
+
+    @property
+    def size(self) -> int:
+        return sum(len(old) for _, _, old in self.arrays) + sum(
+            len(fields) for _, fields in self.objects)
+
+
+class Keyframe(NamedTuple):
+    """The whole tracked state at the end of a turn."""
+    turn: int
+    game_map: GameMap
+    arrays: Dict[str, np.ndarray]
+    states: Dict[int, Tuple[Any, Dict[str, Any]]]  # id: (object, state)
+
+    @property
+    def size(self) -> int:
+        return len(self.states) + sum(array.size for array in self.arrays.values())
+
+
+class RewindBuffer:
+    """
+    Undo information for the last `capacity` turns, see `Engine.perform_turn`.
+
+    After each turn the fields of every tracked object are compared with
+    their values after the previous turn, and the old values of the fields
+    which changed are kept.  The map arrays are compared as a whole and only
+    the cells which changed are kept.  Rewinding a turn sets those values
+    back, so it costs as much as the turn changed.
+
+    Every `keyframe_interval` turns the whole state is kept as well, going far
+    back starts from a keyframe when that is cheaper than undoing every turn.
+    """
+
+    def __init__(
+        self,
+        capacity: int = cfg.REWIND_TURNS,
+        keyframe_interval: int = cfg.REWIND_KEYFRAME_INTERVAL,
+    ):
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        self.clear()
+
+    def clear(self) -> None:
+        self.turn = 0
+        self.deltas: Deque[TurnDelta] = deque(maxlen=self.capacity)
+        self.keyframes: Deque[Keyframe] = deque()
+        # What every tracked object looked like after the last turn.
+        self.states: Dict[int, Tuple[Any, Dict[str, Any]]] = {}
+        self.game_map: Optional[GameMap] = None
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        """The number of turns which can be rewound."""
+        return len(self.deltas)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Undo information refers to live objects, it isn't saved.
+        return {"capacity": self.capacity, "keyframe_interval": self.keyframe_interval}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.clear()
+
+    def start_turn(self, engine: Engine) -> None:
+        """Take note of the state before the first turn."""
+        if not self.states:
+            self.states = self.snapshot_objects(engine)
+            self.copy_arrays(engine.game_map)
+
+    def snapshot_objects(self, engine: Engine) -> Dict[int, Tuple[Any, Dict[str, Any]]]:
+        return {id(obj): (obj, snapshot(obj)) for obj in tracked_objects(engine)}
+
+    def copy_arrays(self, game_map: GameMap) -> None:
+        self.game_map = game_map
+        self.arrays = {name: getattr(game_map, name).copy() for name in MAP_ARRAYS}
+
+    def end_turn(self, engine: Engine) -> None:
+        """Keep what the turn just performed changed."""
+        self.deltas.append(self.capture(engine))
+        self.turn += 1
+        oldest = self.turn - len(self.deltas)
+        while self.keyframes and self.keyframes[0].turn < oldest:
+            self.keyframes.popleft()
+        if self.turn % self.keyframe_interval == 0:
+            self.keyframes.append(Keyframe(
+                self.turn,
+                self.game_map,
+                {name: array.copy() for name, array in self.arrays.items()},
+                self.states,
+            ))
+
+    def capture(self, engine: Engine) -> TurnDelta:
+        """Return how to undo what changed since the last capture."""
+        arrays = []
+        if engine.game_map is self.game_map:
+            for name in MAP_ARRAYS:
+                current, previous = getattr(self.game_map, name), self.arrays[name]
+                changed = np.nonzero(raw(current) != raw(previous))
+                if len(changed[0]):
+                    arrays.append((name, changed, previous[changed]))
+                    previous[changed] = current[changed]
+        old_map = self.game_map
+        if engine.game_map is not self.game_map:
+            # The map arrays only change on the floor the player is on.
+            self.copy_arrays(engine.game_map)
+
+        old_states = self.states
+        states = self.snapshot_objects(engine)
+        objects = []
+        for key, (obj, old) in old_states.items():
+            new = states.get(key)
+            if new is None:
+                # No longer tracked, it can still have changed on the way out.
+                new = (obj, snapshot(obj))
+            if new[1] != old:
+                fields = {name: value for name, value in old.items()
+                          if new[1].get(name, MISSING) != value}
+                fields.update(dict.fromkeys(new[1].keys() - old.keys(), MISSING))
+                objects.append((obj, fields))
+        self.states = states
+        return TurnDelta(old_map, arrays, objects)
+
+    def rewind(self, engine: Engine, turns: int) -> int:
+        """Put the game back as it was `turns` turns ago, or as far as possible.
+
+        Returns the number of turns rewound.
+        """
+        turns = min(turns, len(self.deltas))
+        if turns <= 0:
+            return 0
+        target = self.turn - turns
+        restored: Dict[int, Any] = {}
+        # Changes since the last turn, like a level up or a command's messages, go first.
+        self.undo(self.capture(engine), restored)
+        deltas = list(self.deltas)[-turns:]  # Turns target + 1 to now.
+        # Undoing each turn, or starting from a keyframe and undoing the turns before it.
+        best_cost = sum(delta.size for delta in deltas)
+        best_keyframe: Optional[Keyframe] = None
+        for keyframe in self.keyframes:
+            if target <= keyframe.turn < self.turn:
+                cost = keyframe.size + sum(
+                    delta.size for delta in deltas[:keyframe.turn - target])
+                if cost < best_cost:
+                    best_cost, best_keyframe = cost, keyframe
+
+        if best_keyframe is not None:
+            for obj, state in best_keyframe.states.values():
+                restore(obj, state)
+                restored[id(obj)] = obj
+            for name, array in best_keyframe.arrays.items():
+                getattr(best_keyframe.game_map, name)[...] = array
+            deltas = deltas[:best_keyframe.turn - target]
+        for delta in reversed(deltas):
+            self.undo(delta, restored, sync=best_keyframe is None)
+
+        for _ in range(turns):
+            self.deltas.pop()
+        while self.keyframes and self.keyframes[-1].turn > target:
+            self.keyframes.pop()
+        self.turn = target
+        game_map = engine.game_map
+        if best_keyframe is not None or game_map is not self.game_map:
+            self.copy_arrays(game_map)
+        self.after_rewind(engine, restored.values())
+        return turns
+
+    def undo(self, delta: TurnDelta, restored: Dict[int, Any], sync: bool = True) -> None:
+        """Set back what `delta` changed, adding the objects restored to `restored`.
+
+        With `sync` the copies of the map arrays are kept up to date as well.
+        """
+        for name, indices, old in delta.arrays:
+            getattr(delta.game_map, name)[indices] = old
+            if sync and delta.game_map is self.game_map:
+                self.arrays[name][indices] = old
+        for obj, fields in reversed(delta.objects):
+            restore(obj, fields)
+            restored[id(obj)] = obj
+
+    def after_rewind(self, engine: Engine, restored: Iterable[Any]) -> None:
+        """Bring caches up to date and track the restored objects from here on."""
+        game_map = engine.game_map
+        for obj in restored:
+            self.states[id(obj)] = obj, snapshot(obj)
+            if hasattr(obj, "render_order"):  # An entity.
+                if obj in game_map.entities:
+                    game_map.render_index.add(obj)
+                else:
+                    game_map.render_index.remove(obj)
+        game_map.explore_map.valid = False
+        game_map.version += 1
+        engine.message_log.version += 1
@@ -0,0 +1,39 @@
+"""Seeded random number streams, one per subsystem, so a game can be reproduced."""
+from __future__ import annotations
+
+import random
+from typing import Dict, Optional
+
+# The subsystems with a stream of their own.  Drawing numbers from one never
+# changes what the others draw.
+STREAMS = ("map", "spawn", "ai", "combat", "cosmetic")
+
+
+class RNGService:
+    """
+    Hands out `random.Random` streams derived from a single game seed.
+
+    `stream` returns a long lived stream whose state is saved with the game.
+    `floor` returns a fresh stream for one floor, so the same seed always
+    generates the same floor no matter what happened before it.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.seed = seed
+        self.streams: Dict[str, random.Random] = {}
+
+    def stream(self, name: str) -> random.Random:
+        stream = self.streams.get(name)
+        if stream is None:
+            if name not in STREAMS:
+                raise KeyError(f"Unknown random stream {name!r}.")
+            stream = self.streams[name] = random.Random(f"{self.seed}:{name}")
+        return stream
+
+    def floor(self, name: str, floor: int) -> random.Random:
+        """Return a new stream for generating part of floor number `floor`."""
+        if name not in STREAMS:
+            raise KeyError(f"Unknown random stream {name!r}.")
+        return random.Random(f"{self.seed}:{name}:{floor}")
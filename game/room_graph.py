@@ -0,0 +1,193 @@
+"""Room and corridor connectivity of a generated floor, used for long paths."""
+from __future__ import annotations
+
+import heapq
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+import tcod
+
+if TYPE_CHECKING:
+    from game.procgen import RectangularRoom
+
+Point = Tuple[int, int]
+Area = Tuple[slice, slice]
+# Returns the path cost of the tiles of an area of the map.
+CostFunction = Callable[[Area], np.ndarray]
+
+
+class RoomGraph:
+    """
+    A graph with a node for each room of a floor and an edge for each
+    corridor joining two rooms, weighted by the corridor's length.
+
+    Long paths are found by searching this graph first and then only
+    searching the tiles of the rooms and corridors on the route.
+    """
+
+    def __init__(
+        self,
+        rooms: Sequence[RectangularRoom],
+        region: np.ndarray,
+        corridor: np.ndarray,
+        edges: List[Tuple[int, int, int]],
+        edge_tiles: List[np.ndarray],
+    ):
+        # Bounds (x1, y1, x2, y2) of each rooms floor.
+        self.bounds: List[Tuple[int, int, int, int]] = [
+            (room.x1 + 1, room.y1 + 1, room.x2, room.y2) for room in rooms]
+        self.centers: List[Point] = [room.center for room in rooms]
+        self.region = region  # Room index of each tile, -1 outside of rooms.
+        self.corridor = corridor  # Edge index of each corridor tile, or -1.
+        self.edges = edges  # (room, room, length)
+        self.edge_tiles = edge_tiles  # The corridor tiles of each edge as (x, y) rows.
+        # room: [(neighbour, length, edge)]
+        self.neighbours: Dict[int, List[Tuple[int, int, int]]] = {
+            i: [] for i in range(len(rooms))}
+        for edge, (a, b, length) in enumerate(edges):
+            self.neighbours[a].append((b, length, edge))
+            self.neighbours[b].append((a, length, edge))
+
+    @classmethod
+    def build(
+        cls,
+        width: int,
+        height: int,
+        rooms: Sequence[RectangularRoom],
+        tunnels: Sequence[Sequence[Point]],
+    ) -> RoomGraph:
+        """Build the graph from the rooms of a floor and the tiles of the
+        tunnels dug between them.
+
+        A tunnel which passes through other rooms on its way is split into
+        one edge between each pair of rooms it joins, and tunnels which cross
+        add edges between the rooms at their ends.
+        """
+        region = np.full((width, height), -1, dtype=np.int16, order="F")
+        for i, room in enumerate(rooms):
+            region[room.inner] = i
+        corridor = np.full((width, height), -1, dtype=np.int32, order="F")
+        edges: List[Tuple[int, int, int]] = []
+        edge_tiles: List[np.ndarray] = []
+        crossings: Set[Tuple[int, int]] = set()
+
+        def add_edge(a: int, b: int, tiles: np.ndarray) -> None:
+            # Count the walk across the rooms too, from center to center.
+            (ax, ay), (bx, by) = rooms[a].center, rooms[b].center
+            edges.append((a, b, max(len(tiles) + 1, abs(ax - bx), abs(ay - by))))
+            edge_tiles.append(tiles)
+
+        for tunnel in tunnels:
+            points = np.array(tunnel, dtype=np.intp).reshape(-1, 2)
+            tunnel_rooms = region[points[:, 0], points[:, 1]]
+            inside = np.flatnonzero(tunnel_rooms >= 0)
+            # The tunnel leaves one room and enters another between these tiles.
+            changes = np.flatnonzero(np.diff(tunnel_rooms[inside]))
+            for i, j in zip(inside[changes].tolist(), inside[changes + 1].tolist()):
+                between = points[i + 1:j]
+                xs, ys = between[:, 0], between[:, 1]
+                existing = corridor[xs, ys]
+                for edge in np.unique(existing[existing >= 0]).tolist():
+                    crossings.add((edge, len(edges)))
+                corridor[xs[existing < 0], ys[existing < 0]] = len(edges)
+                add_edge(int(tunnel_rooms[i]), int(tunnel_rooms[j]), between)
+
+        # Corridors which cross each other join the rooms at both of their ends.
+        for e, f in sorted(crossings):
+            tiles = np.concatenate((edge_tiles[e], edge_tiles[f]))
+            for a in edges[e][:2]:
+                for b in edges[f][:2]:
+                    if a != b:
+                        add_edge(a, b, tiles)
+        return cls(rooms, region, corridor, edges, edge_tiles)
+
+    def nodes_at(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """Return the rooms (room, distance) a tile is in or leads to."""
+        room = int(self.region[x, y])
+        if room >= 0:
+            return [(room, 0)]
+        edge = int(self.corridor[x, y])
+        if edge < 0:
+            return []
+        return [
+            (room, max(abs(x - cx), abs(y - cy)))
+            for room in self.edges[edge][:2]
+            for cx, cy in (self.centers[room],)
+        ]
+
+    def route(self, start: Point, goal: Point) -> Optional[Tuple[List[int], List[int]]]:
+        """Return the rooms and edges on the shortest route from `start` to `goal`."""
+        sources = self.nodes_at(*start)
+        targets = dict(self.nodes_at(*goal))
+        if not sources or not targets:
+            return None
+        distance: Dict[int, int] = {}
+        previous: Dict[int, Tuple[int, int]] = {}  # room: (room, edge)
+        heap: List[Tuple[int, int]] = []
+        for room, cost in sources:
+            distance[room] = cost
+            heapq.heappush(heap, (cost, room))
+        best: Optional[Tuple[int, int]] = None  # (total, room)
+        while heap:
+            cost, room = heapq.heappop(heap)
+            if cost > distance[room]:
+                continue
+            if best is not None and cost >= best[0]:
+                break
+            if room in targets and (best is None or cost + targets[room] < best[0]):
+                best = cost + targets[room], room
+            for neighbour, length, edge in self.neighbours[room]:
+                new_cost = cost + length
+                if new_cost < distance.get(neighbour, new_cost + 1):
+                    distance[neighbour] = new_cost
+                    previous[neighbour] = room, edge
+                    heapq.heappush(heap, (new_cost, neighbour))
+        if best is None:
+            return None
+        rooms = [best[1]]
+        edges: List[int] = []
+        while rooms[-1] in previous:
+            room, edge = previous[rooms[-1]]
+            rooms.append(room)
+            edges.append(edge)
+        return rooms, edges
+
+    def find_path(self, cost: CostFunction, start: Point, goal: Point) -> Optional[List[Point]]:
+        """Return a path from `start` to `goal`, not including `start`.
+
+        `cost` returns the costs a grid search would use for an area, it is
+        only asked for the window holding the route and the search is limited
+        to the rooms and corridors along it.  Returns None if the graph can't
+        help, the caller should then search the whole grid.
+        """
+        route = self.route(start, goal)
+        if route is None:
+            return None
+        rooms, edges = route
+        for x, y in (start, goal):
+            edge = int(self.corridor[x, y])
+            if edge >= 0:
+                edges.append(edge)
+        tiles = [self.edge_tiles[edge] for edge in edges]
+        tiles.append(np.array([start, goal], dtype=np.intp))
+        corridors = np.concatenate(tiles)
+        # Search the smallest window holding the whole route.
+        x1 = min(min(self.bounds[room][0] for room in rooms), corridors[:, 0].min())
+        y1 = min(min(self.bounds[room][1] for room in rooms), corridors[:, 1].min())
+        x2 = max(max(self.bounds[room][2] for room in rooms), corridors[:, 0].max() + 1)
+        y2 = max(max(self.bounds[room][3] for room in rooms), corridors[:, 1].max() + 1)
+        on_route = np.zeros((x2 - x1, y2 - y1), dtype=bool, order="F")
+        for room in rooms:
+            rx1, ry1, rx2, ry2 = self.bounds[room]
+            on_route[rx1 - x1:rx2 - x1, ry1 - y1:ry2 - y1] = True
+        on_route[corridors[:, 0] - x1, corridors[:, 1] - y1] = True
+        window = cost((slice(x1, x2), slice(y1, y2)))
+        window[~on_route] = 0
+
+        graph = tcod.path.SimpleGraph(cost=window, cardinal=2, diagonal=3)
+        pathfinder = tcod.path.Pathfinder(graph)
+        pathfinder.add_root((start[0] - x1, start[1] - y1))
+        path = pathfinder.path_to((goal[0] - x1, goal[1] - y1))
+        if len(path) < 2:
+            return None  # Blocked inside the route.
+        return [(x + x1, y + y1) for x, y in path[1:].tolist()]
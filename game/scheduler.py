@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import heapq
+from typing import Iterator, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from game.entity import Actor
+
+# Game time spent by an actor at NORMAL_SPEED for one action.  An actor with
+# twice the speed acts twice as often.
+ACTION_COST = 100
+NORMAL_SPEED = 100
+
+
+class TurnScheduler:
+    """
+    Orders actor turns with a heap keyed by the game time of their next action.
+
+    Ties are broken by the order actors were scheduled in, so the order of
+    turns is the same on every run.
+    """
+
+    def __init__(self) -> None:
+        self.time = 0
+        # (time, sequence, actor, actor generation)
+        self.queue: List[Tuple[int, int, Actor, int]] = []
+        self.sequence = 0
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def schedule(self, actor: Actor, delay: int) -> None:
+        """Schedule `actor` to act `delay` units of game time from now."""
+        heapq.heappush(
+            self.queue, (self.time + delay, self.sequence, actor, actor.generation))
+        self.sequence += 1
+
+    def advance(self, delay: int) -> Iterator[Actor]:
+        """Move the clock forward by `delay`, yielding each actor whose turn comes up.
+
+        Actors are removed from the queue when yielded, the caller reschedules
+        them after they act.  Actors scheduled during iteration are yielded too
+        if their turn comes up before the clock stops.  Turns scheduled before
+        an actor was recycled are skipped.
+        """
+        end = self.time + delay
+        queue = self.queue
+        while queue and queue[0][0] <= end:
+            self.time, _, actor, generation = heapq.heappop(queue)
+            if generation == actor.generation:
+                yield actor
+        self.time = end
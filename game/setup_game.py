@@ -27,8 +27,11 @@ from game.tile_types import graphic_dt
 background_image = tcod.image.load("data/menu_background.png")[:, :, :3]
 
 
-def new_game() -> Engine:
-    """Return a brand new game session as an Engine instance."""
+def new_game(seed: Optional[int] = cfg.SEED) -> Engine:
+    """Return a brand new game session as an Engine instance.
+
+    A random seed is picked if `seed` is None.
+    """
     map_width = cfg.MAP_WIDTH
     map_height = cfg.MAP_HEIGHT
 
@@ -38,7 +41,7 @@ def new_game() -> Engine:
 
     player = copy.deepcopy(entity_factories.player)
     camera = Camera(width=cfg.CAMERA_WIDTH, height=cfg.CAMERA_HEIGHT)
-    engine = Engine(player=player, camera=camera)
+    engine = Engine(player=player, camera=camera, seed=seed)
 
     engine.game_world = GameWorld(
         engine=engine,
@@ -93,9 +96,11 @@ class MainMenu(input_handlers.BaseEventHandler):
         """Animate the menu."""
 
         def __init__(self, width, height):
-            self.generator = self.make_generator()
             self.width = width
             self.height = height
+            # A stream of its own so the menu never touches gameplay randomness.
+            self.rng = random.Random()
+            self.generator = self.make_generator()
             self.duration = None
             self.frame_ratio = None
 
@@ -109,8 +114,8 @@ class MainMenu(input_handlers.BaseEventHandler):
             while True:
                 for i in range(row):
                     for j in range(column):
-                        ri = random.randrange(len(items))
-                        randcolor = random.randint(0, 2)
+                        ri = self.rng.randrange(len(items))
+                        randcolor = self.rng.randint(0, 2)
                         fg_color = color.dark_green
                         if randcolor == 1:
                             fg_color = color.light_green
@@ -0,0 +1,246 @@
+"""Streaming the screen of a game to spectators on the same machine.
+
+The game runs a `SpectatorServer` which sends every frame to the viewers
+connected to it, over a UNIX socket or local TCP.  A viewer gets the whole
+frame when it connects and from then on only the changes:
+
+    python -m game.spectator unix:/tmp/game.sock
+    python -m game.spectator 127.0.0.1:7000
+
+Each message is a header followed by a zlib compressed payload.  The payload
+of a KEYFRAME is the frame's `tiles_rgb` as bytes in Fortran order, the
+payload of a DELTA is those bytes XOR the previous frame's, which is mostly
+zeros and compresses to almost nothing when little changed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np  # type: ignore
+import tcod
+
+Address = Union[str, Tuple[str, int]]  # A socket path or (host, port).
+
+KEYFRAME = 0
+DELTA = 1
+HEADER = struct.Struct("<BHHI")  # Kind, width, height, payload length.
+
+COMPRESSION_LEVEL = 1  # Fast, frames differ little.
+# A viewer with more than this many bytes not yet sent to it stops getting
+# deltas, it gets a new keyframe once it has caught up.
+MAX_BACKLOG = 1024 * 1024
+
+
+def parse_address(text: str) -> Address:
+    """Parse "unix:PATH", "HOST:PORT" or "PORT"."""
+    if text.startswith("unix:"):
+        return text[len("unix:"):]
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def encode(kind: int, shape: Tuple[int, int], data: bytes) -> bytes:
+    payload = zlib.compress(data, COMPRESSION_LEVEL)
+    return HEADER.pack(kind, shape[0], shape[1], len(payload)) + payload
+
+
+def delta_message(previous: bytes, frame: bytes, shape: Tuple[int, int]) -> Optional[bytes]:
+    """Return the DELTA from `previous` to `frame`, None if they're the same."""
+    changes = np.bitwise_xor(
+        np.frombuffer(frame, dtype=np.uint8), np.frombuffer(previous, dtype=np.uint8))
+    if not changes.any():
+        return None
+    return encode(DELTA, shape, changes.tobytes())
+
+
+class SpectatorServer:
+    """
+    Sends the frames passed to `publish` to every connected viewer.
+
+    The server runs an asyncio loop on a thread of its own, so the game only
+    pays for copying each frame.  Diffing, compressing and sending are done on
+    the server's thread.
+    """
+
+    def __init__(self, address: Address):
+        self.address = address
+        self.loop = asyncio.new_event_loop()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.thread = threading.Thread(target=self.run, name="spectator", daemon=True)
+        self.started = threading.Event()
+        self.error: Optional[BaseException] = None
+        # Viewers and whether they're waiting for a keyframe after falling behind.
+        self.viewers: Dict[asyncio.StreamWriter, bool] = {}
+        self.frame: Optional[bytes] = None
+        self.shape: Tuple[int, int] = (0, 0)
+        self.keyframe: Optional[bytes] = None  # Message of `frame`, made when needed.
+
+    def start(self) -> None:
+        """Start listening, raises OSError if the address can't be used."""
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+
+    def run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.listen())
+        except OSError as exc:
+            self.error = exc
+        finally:
+            self.started.set()
+        if self.error is None:
+            self.loop.run_forever()
+        self.loop.close()
+
+    async def listen(self) -> None:
+        if isinstance(self.address, str):
+            self.server = await asyncio.start_unix_server(self.connected, path=self.address)
+        else:
+            self.server = await asyncio.start_server(self.connected, *self.address)
+
+    async def connected(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+    ) -> None:
+        self.viewers[writer] = False
+        if self.frame is not None:
+            writer.write(self.keyframe_message())
+        try:
+            await reader.read()  # Viewers don't send anything, this waits for them to leave.
+        except ConnectionError:
+            pass
+        finally:
+            self.viewers.pop(writer, None)
+            writer.close()
+
+    def keyframe_message(self) -> bytes:
+        if self.keyframe is None:
+            self.keyframe = encode(KEYFRAME, self.shape, self.frame)
+        return self.keyframe
+
+    def publish(self, console: tcod.Console) -> None:
+        """Send a frame to the viewers, called from the game's thread."""
+        tiles = console.tiles_rgb
+        frame = tiles.tobytes(order="F")
+        self.loop.call_soon_threadsafe(self.broadcast, frame, tiles.shape)
+
+    def broadcast(self, frame: bytes, shape: Tuple[int, int]) -> None:
+        previous = self.frame
+        same_shape = shape == self.shape
+        self.frame, self.shape, self.keyframe = frame, shape, None
+        if not self.viewers:
+            return
+        delta: Optional[bytes] = None
+        if previous is not None and same_shape:
+            delta = delta_message(previous, frame, shape)
+            if delta is None:
+                return  # Nothing changed.
+
+        for writer, behind in list(self.viewers.items()):
+            if writer.is_closing():
+                continue
+            backlog = writer.transport.get_write_buffer_size()
+            if backlog > MAX_BACKLOG:
+                self.viewers[writer] = True  # Its next frame has to be a keyframe.
+            elif behind or delta is None:
+                writer.write(self.keyframe_message())
+                self.viewers[writer] = False
+            else:
+                writer.write(delta)
+
+    def close(self) -> None:
+        """Disconnect the viewers and stop the server."""
+        if not self.thread.is_alive():
+            return
+
+        async def shut_down() -> None:
+            if self.server is not None:
+                self.server.close()
+            for writer in list(self.viewers):
+                writer.close()
+            # Let the viewers' connections finish closing.
+            connections = asyncio.all_tasks() - {asyncio.current_task()}
+            if connections:
+                await asyncio.wait(connections, timeout=1)
+            self.loop.stop()
+
+        self.loop.call_soon_threadsafe(lambda: self.loop.create_task(shut_down()))
+        self.thread.join()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class Viewer:
+    """Rebuilds the frames sent by a `SpectatorServer`."""
+
+    def __init__(self) -> None:
+        self.console: Optional[tcod.Console] = None
+        self.frame: Optional[np.ndarray] = None  # The frame's bytes.
+
+    def apply(self, kind: int, shape: Tuple[int, int], payload: bytes) -> tcod.Console:
+        """Apply a message and return the console showing the frame."""
+        data = np.frombuffer(zlib.decompress(payload), dtype=np.uint8)
+        if kind == KEYFRAME:
+            if self.console is None or self.console.tiles_rgb.shape != shape:
+                self.console = tcod.Console(*shape, order="F")
+            self.frame = data.copy()
+        elif self.frame is None:
+            raise ValueError("A delta came before any keyframe.")
+        else:
+            np.bitwise_xor(self.frame, data, out=self.frame)
+        tiles = self.console.tiles_rgb
+        tiles[...] = self.frame.view(tiles.dtype).reshape(shape, order="F")
+        return self.console
+
+    async def watch(self, address: Address, context: object) -> None:
+        """Show the frames of the server at `address` until it goes away.
+
+        `context` is anything with a `present(console)` method.
+        """
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    return  # The game ended.
+                kind, width, height, length = HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                context.present(self.apply(kind, (width, height), payload))
+        finally:
+            writer.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from game.terminal import TerminalContext
+
+    parser = argparse.ArgumentParser(
+        prog="python -m game.spectator", description="Watch a game in the terminal.")
+    parser.add_argument(
+        "address", help='where the game streams to, "unix:PATH", "HOST:PORT" or "PORT"')
+    args = parser.parse_args(argv)
+
+    try:
+        with TerminalContext() as context:
+            asyncio.run(Viewer().watch(parse_address(args.address), context))
+    except (ConnectionError, FileNotFoundError) as exc:
+        print(f"Can't watch {args.address}: {exc}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Timed status effects, kept in arrays so that any number of them tick at once."""
+from __future__ import annotations
+
+from enum import IntEnum
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import game.color as color
+
+if TYPE_CHECKING:
+    from game.engine import Engine
+    from game.entity import Actor
+
+
+class Effect(IntEnum):
+    CONFUSED = 0  # Stumbles around at random.
+    POISONED = 1  # Takes `magnitude` damage every turn.
+
+
+class StatusEffects:
+    """
+    A table of the timed effects on every actor, one row per actor and effect.
+
+    Rows hold an actor id, the effect, the turns remaining and a magnitude.
+    `tick` counts every row down in one pass, and `flags` holds a bit per
+    effect for each actor id so AI and combat can check for an effect without
+    searching the table.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.count = 0
+        self.actor_ids = np.zeros(capacity, dtype=np.int32)
+        self.effects = np.zeros(capacity, dtype=np.int8)
+        self.remaining = np.zeros(capacity, dtype=np.int32)
+        self.magnitudes = np.zeros(capacity, dtype=np.int32)
+
+        # Actors are given small ids while they have any effects.
+        self.ids: Dict[Actor, int] = {}
+        self.actors: List[Optional[Actor]] = []
+        self.free_ids: List[int] = []
+        self.flags = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def id_of(self, actor: Actor) -> int:
+        actor_id = self.ids.get(actor)
+        if actor_id is None:
+            if self.free_ids:
+                actor_id = self.free_ids.pop()
+                self.actors[actor_id] = actor
+            else:
+                actor_id = len(self.actors)
+                self.actors.append(actor)
+                if actor_id >= len(self.flags):
+                    self.flags = np.resize(self.flags, max(16, actor_id * 2))
+                    self.flags[actor_id:] = 0
+            self.ids[actor] = actor_id
+        return actor_id
+
+    def has(self, actor: Actor, effect: Effect) -> bool:
+        actor_id = self.ids.get(actor)
+        return actor_id is not None and bool(self.flags[actor_id] & (1 << effect))
+
+    def reserve(self, count: int) -> None:
+        """Grow the table to fit `count` more rows."""
+        needed = self.count + count
+        capacity = len(self.actor_ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("actor_ids", "effects", "remaining", "magnitudes"):
+            column = np.zeros(capacity, dtype=getattr(self, name).dtype)
+            column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+
+    def apply(self, actor: Actor, effect: Effect, turns: int, magnitude: int = 0) -> None:
+        self.apply_area([actor], effect, turns, magnitude)
+
+    def apply_area(self, actors: Iterable[Actor], effect: Effect, turns: int, magnitude: int = 0) -> None:
+        """Give `effect` to all of `actors`.
+
+        Actors which already have the effect get the longer duration and the
+        stronger magnitude of the two.
+        """
+        ids = np.array([self.id_of(actor)
+                       for actor in actors], dtype=np.int32)
+        if not len(ids):
+            return
+        n = self.count
+        existing = (self.effects[:n] == effect) & np.isin(
+            self.actor_ids[:n], ids)
+        np.maximum(self.remaining[:n], turns,
+                   out=self.remaining[:n], where=existing)
+        np.maximum(self.magnitudes[:n], magnitude,
+                   out=self.magnitudes[:n], where=existing)
+        ids = ids[~np.isin(ids, self.actor_ids[:n][existing])]
+
+        self.reserve(len(ids))
+        rows = slice(n, n + len(ids))
+        self.actor_ids[rows] = ids
+        self.effects[rows] = effect
+        self.remaining[rows] = turns
+        self.magnitudes[rows] = magnitude
+        self.count += len(ids)
+        self.flags[ids] |= 1 << effect
+
+    def purge(self, actor: Actor) -> None:
+        """Remove all effects from `actor`, for example when it dies."""
+        actor_id = self.ids.get(actor)
+        if actor_id is not None:
+            self.keep(self.actor_ids[:self.count] != actor_id)
+            self.release(actor_id)
+
+    def release(self, actor_id: int) -> None:
+        actor = self.actors[actor_id]
+        del self.ids[actor]
+        self.flags[actor_id] = 0
+        self.actors[actor_id] = None
+        self.free_ids.append(actor_id)
+
+    def clear(self, keep: Iterable[Actor] = ()) -> None:
+        """Remove the effects of every actor except those in `keep`."""
+        for actor in list(self.ids):
+            if actor not in keep:
+                self.purge(actor)
+
+    def keep(self, rows: np.ndarray) -> None:
+        """Keep only the rows where `rows` is True, closing the gaps."""
+        n = self.count
+        kept = int(rows.sum())
+        for column in (self.actor_ids, self.effects, self.remaining, self.magnitudes):
+            column[:kept] = column[:n][rows]
+        self.count = kept
+
+    def tick(self, engine: Engine) -> None:
+        """Advance every effect by one turn."""
+        n = self.count
+        if not n:
+            return
+        actor_ids = self.actor_ids[:n]
+        effects = self.effects[:n]
+        visible = engine.game_map.visible
+
+        # Total the damage now but deal it last, as deaths change the table.
+        poisoned = effects == Effect.POISONED
+        damage = np.bincount(
+            actor_ids[poisoned], self.magnitudes[:n][poisoned], len(self.actors))
+        damaged = [(self.actors[i], int(damage[i]))
+                   for i in np.flatnonzero(damage).tolist()]
+
+        self.remaining[:n] -= 1
+        expired = self.remaining[:n] <= 0
+        if expired.any():
+            for actor_id, effect in zip(actor_ids[expired].tolist(), effects[expired].tolist()):
+                actor = self.actors[actor_id]
+                name = Effect(effect).name.lower()
+                if actor is engine.player:
+                    engine.message_log.add_message(
+                        f"You are no longer {name}.", color.status_effect_applied)
+                elif visible[actor.x, actor.y]:
+                    engine.message_log.add_message(
+                        f"The {actor.name} is no longer {name}.", color.status_effect_applied)
+            self.keep(~expired)
+            n = self.count
+            self.flags[:] = 0
+            np.bitwise_or.at(self.flags, self.actor_ids[:n],
+                             (1 << self.effects[:n]).astype(np.uint8))
+            for actor_id in set(self.ids.values()) - set(self.actor_ids[:n].tolist()):
+                self.release(actor_id)
+
+        for actor, amount in damaged:
+            if not actor.is_alive:
+                continue
+            if actor is engine.player:
+                engine.message_log.add_message(
+                    f"You take {amount} poison damage.", color.enemy_atk)
+            elif visible[actor.x, actor.y]:
+                engine.message_log.add_message(
+                    f"The {actor.name} takes {amount} poison damage.")
+            actor.fighter.take_damage(amount)
@@ -0,0 +1,218 @@
+"""Playing in a terminal with ANSI escapes, for servers without a display.
+
+Only the cells which changed since the last frame are sent, so the output
+follows how much of the screen changes rather than its size.
+"""
+from __future__ import annotations
+
+import os
+import select
+import sys
+from typing import BinaryIO, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+import tcod
+
+import game.game_config as cfg
+
+CSI = "\x1b["
+
+# Escape sequences of special keys: sym.
+SEQUENCE_KEYS = {
+    "[A": tcod.event.K_UP,
+    "[B": tcod.event.K_DOWN,
+    "[C": tcod.event.K_RIGHT,
+    "[D": tcod.event.K_LEFT,
+    "[H": tcod.event.K_HOME,
+    "[F": tcod.event.K_END,
+    "[1~": tcod.event.K_HOME,
+    "[4~": tcod.event.K_END,
+    "[5~": tcod.event.K_PAGEUP,
+    "[6~": tcod.event.K_PAGEDOWN,
+    "OP": tcod.event.K_F1,
+    "OQ": tcod.event.K_F2,
+    "OR": tcod.event.K_F3,
+    "OS": tcod.event.K_F4,
+}
+
+# Characters typed with shift on a US keyboard: the unshifted key.
+SHIFTED = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+
+# Control characters which are keys of their own.
+CONTROL_KEYS = {
+    "\r": tcod.event.K_RETURN,
+    "\n": tcod.event.K_RETURN,
+    "\t": tcod.event.K_TAB,
+    "\x08": tcod.event.K_BACKSPACE,
+    "\x7f": tcod.event.K_BACKSPACE,
+}
+
+
+def changed_cells(tiles: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Return where two `tiles_rgb` arrays differ.
+
+    The fields are compared one by one, the cells have padding bytes which
+    copies of the array don't keep.
+    """
+    return (
+        (tiles["ch"] != previous["ch"])
+        | (tiles["fg"] != previous["fg"]).any(axis=-1)
+        | (tiles["bg"] != previous["bg"]).any(axis=-1)
+    )
+
+
+def key_event(text: str) -> Optional[tcod.event.KeyDown]:
+    """Return the key press of one typed character or escape sequence."""
+    mod = 0
+    if text.startswith("\x1b") and len(text) > 1:
+        sym = SEQUENCE_KEYS.get(text[1:])
+        if sym is not None:
+            return tcod.event.KeyDown(0, sym, 0)
+        text = text[1:]
+        mod = tcod.event.KMOD_LALT  # Alt sends escape before the key.
+    if len(text) != 1:
+        return None
+    if text == "\x1b":
+        return tcod.event.KeyDown(0, tcod.event.K_ESCAPE, mod)
+    if text in CONTROL_KEYS:
+        return tcod.event.KeyDown(0, CONTROL_KEYS[text], mod)
+    code = ord(text)
+    if code < 32:  # Ctrl and a letter.
+        return tcod.event.KeyDown(0, code + ord("a") - 1, mod | tcod.event.KMOD_LCTRL)
+    if text.isupper():
+        return tcod.event.KeyDown(0, ord(text.lower()), mod | tcod.event.KMOD_LSHIFT)
+    if text in SHIFTED:
+        return tcod.event.KeyDown(0, ord(SHIFTED[text]), mod | tcod.event.KMOD_LSHIFT)
+    if code < 128:
+        return tcod.event.KeyDown(0, code, mod)
+    return None
+
+
+def split_keys(data: str) -> List[str]:
+    """Split typed text into characters and escape sequences."""
+    keys = []
+    i = 0
+    while i < len(data):
+        if data[i] != "\x1b" or i + 1 == len(data):
+            keys.append(data[i])
+            i += 1
+            continue
+        # An escape sequence ends with a letter or ~, alt and a key is two characters.
+        j = i + 1
+        if data[j] in "[O":
+            j += 1
+            while j < len(data) and not (data[j].isalpha() or data[j] == "~"):
+                j += 1
+        keys.append(data[i:j + 1])
+        i = j + 1
+    return keys
+
+
+class TerminalPresenter:
+    """
+    Writes the root console's `tiles_rgb` to a terminal as truecolor ANSI.
+
+    Each frame is compared with the last one presented and only the cells
+    which differ are written, moving the cursor only where the changed cells
+    aren't next to each other and changing colors only when they differ from
+    the last cell written.  A frame goes out as a single write.
+    """
+
+    def __init__(self, stream: Optional[BinaryIO] = None):
+        self.stream = stream if stream is not None else sys.stdout.buffer
+        self.previous: Optional[np.ndarray] = None
+        self.bytes_written = 0  # Of the last frame.
+
+    def invalidate(self) -> None:
+        """Draw the whole screen next frame, after the terminal was cleared."""
+        self.previous = None
+
+    def present(self, console: tcod.Console) -> None:
+        tiles = console.tiles_rgb
+        parts: List[str] = []
+        if self.previous is None or self.previous.shape != tiles.shape:
+            parts.append(f"{CSI}0m{CSI}2J")
+            changed = np.ones(tiles.shape, dtype=bool)
+            self.previous = tiles.copy()
+        else:
+            changed = changed_cells(tiles, self.previous)
+            np.copyto(self.previous, tiles)
+        # Row by row, the order the terminal's cursor advances in.
+        ys, xs = np.nonzero(changed.T)
+        if len(xs) == 0 and not parts:
+            self.bytes_written = 0
+            return
+        changed_tiles = tiles[xs, ys]
+
+        cursor: Tuple[int, int] = (-1, -1)
+        fg = bg = None
+        for x, y, ch, cell_fg, cell_bg in zip(
+            xs.tolist(), ys.tolist(), changed_tiles["ch"].tolist(),
+            changed_tiles["fg"].tolist(), changed_tiles["bg"].tolist(),
+        ):
+            if cursor != (x, y):
+                parts.append(f"{CSI}{y + 1};{x + 1}H")
+            if cell_fg != fg:
+                fg = cell_fg
+                parts.append(f"{CSI}38;2;{fg[0]};{fg[1]};{fg[2]}m")
+            if cell_bg != bg:
+                bg = cell_bg
+                parts.append(f"{CSI}48;2;{bg[0]};{bg[1]};{bg[2]}m")
+            parts.append(chr(ch) if ch >= 32 else " ")
+            cursor = x + 1, y
+        data = "".join(parts).encode("utf-8")
+        self.stream.write(data)
+        self.stream.flush()
+        self.bytes_written = len(data)
+
+
+class TerminalContext:
+    """
+    Stands in for a `tcod.context.Context` when playing in a terminal.
+
+    Puts the terminal into the alternate screen with the cursor hidden and
+    reads keys as they're typed, restoring everything on exit.  Mouse input
+    isn't supported.
+    """
+
+    def __init__(self, fps: int = cfg.TERMINAL_FPS):
+        self.frame_time = 1 / fps
+        self.presenter = TerminalPresenter()
+        self.input = sys.stdin.fileno()
+        self.saved_mode: Optional[list] = None
+
+    def __enter__(self) -> TerminalContext:
+        import termios
+        import tty
+
+        self.saved_mode = termios.tcgetattr(self.input)
+        tty.setcbreak(self.input)
+        self.write(f"{CSI}?1049h{CSI}?25l")
+        self.presenter.invalidate()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        import termios
+
+        self.write(f"{CSI}0m{CSI}?25h{CSI}?1049l")
+        if self.saved_mode is not None:
+            termios.tcsetattr(self.input, termios.TCSADRAIN, self.saved_mode)
+
+    def write(self, text: str) -> None:
+        self.presenter.stream.write(text.encode())
+        self.presenter.stream.flush()
+
+    def present(self, console: tcod.Console) -> None:
+        self.presenter.present(console)
+
+    def convert_event(self, event: tcod.event.Event) -> None:
+        pass  # There is no mouse to convert.
+
+    def events(self) -> List[tcod.event.Event]:
+        """Return the keys typed, waiting for them up to a frame."""
+        ready, _, _ = select.select([self.input], [], [], self.frame_time)
+        if not ready:
+            return []
+        data = os.read(self.input, 1024).decode("utf-8", errors="ignore")
+        events = [key_event(key) for key in split_keys(data)]
+        return [event for event in events if event is not None]
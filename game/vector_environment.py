@@ -0,0 +1,237 @@
+"""Many games stepped together, for training bots on the CPU.
+
+    env = VectorEnv(256, workers=4)
+    observations = env.reset(seed=1)  # (256, len(LAYERS), width, height)
+    observations, rewards, dones, infos = env.step(actions)
+    env.close()
+"""
+from __future__ import annotations
+
+import multiprocessing
+import random
+import traceback
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import game.game_config as cfg
+from game.environment import BUFFERS, LAYERS, VIEWS, GameEnv
+
+if TYPE_CHECKING:
+    from game.game_map import GameMap
+
+
+class Buffers(NamedTuple):
+    """The arrays a batch is stepped through, one row per game."""
+    observations: np.ndarray  # (games, len(LAYERS), width, height) of int16
+    rewards: np.ndarray  # float32
+    dones: np.ndarray  # bool
+    actions: np.ndarray  # int64
+
+
+def buffer_specs(num_envs: int) -> Dict[str, Tuple[Tuple[int, ...], np.dtype]]:
+    """Return the shape and dtype of each of the `Buffers`."""
+    return {
+        "observations": (
+            (num_envs, len(LAYERS), cfg.MAP_WIDTH, cfg.MAP_HEIGHT), np.dtype(np.int16)),
+        "rewards": ((num_envs,), np.dtype(np.float32)),
+        "dones": ((num_envs,), np.dtype(bool)),
+        "actions": ((num_envs,), np.dtype(np.int64)),
+    }
+
+
+def shared_buffers(
+    blocks: Dict[str, shared_memory.SharedMemory], num_envs: int,
+) -> Buffers:
+    """Return the buffers held by shared memory `blocks`, by name."""
+    return Buffers(**{
+        name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+        for name, (shape, dtype) in buffer_specs(num_envs).items()
+    })
+
+
+class Shard:
+    """Steps the games `start` to `stop` of a batch, writing into its buffers.
+
+    Each game gets a stream of seeds of its own, so the games of a seeded
+    batch are the same however it's split across workers.
+    """
+
+    def __init__(self, buffers: Buffers, start: int, stop: int, floor_reward: float):
+        self.buffers = buffers
+        self.start = start
+        self.envs = [
+            GameEnv(floor_reward, buffers={
+                name: buffers.observations[i, LAYERS.index(name)] for name in BUFFERS})
+            for i in range(start, stop)
+        ]
+        self.seeds = [random.Random() for _ in self.envs]
+        self.maps: List[Optional[GameMap]] = [None] * len(self.envs)  # Last copied from.
+
+    def reset(self, seed: Optional[int]) -> None:
+        for i, env in enumerate(self.envs):
+            index = self.start + i
+            self.seeds[i] = random.Random(None if seed is None else f"{seed}:{index}")
+            self.reset_env(i)
+            self.buffers.rewards[index] = 0
+            self.buffers.dones[index] = False
+
+    def reset_env(self, i: int) -> None:
+        observation = self.envs[i].reset(seed=self.seeds[i].getrandbits(32))
+        self.copy_views(i, observation)
+
+    def copy_views(self, i: int, observation: Dict[str, np.ndarray]) -> None:
+        """Copy the layers which are views of the map into the batch."""
+        row = self.buffers.observations[self.start + i]
+        game_map = self.envs[i].game_map
+        # The tiles only change with the floor.
+        views = VIEWS if game_map is not self.maps[i] else VIEWS[1:]
+        self.maps[i] = game_map
+        for name in views:
+            np.copyto(row[LAYERS.index(name)], observation[name])
+
+    def step(self) -> List[Dict[str, Any]]:
+        """Step every game with its action from the buffers, returns their infos.
+
+        A game which ends is started again, the observation is then the first
+        one of the new game.
+        """
+        buffers = self.buffers
+        infos = []
+        for i, env in enumerate(self.envs):
+            index = self.start + i
+            observation, reward, done, info = env.step(int(buffers.actions[index]))
+            buffers.rewards[index] = reward
+            buffers.dones[index] = done
+            if done:
+                self.reset_env(i)
+            else:
+                self.copy_views(i, observation)
+            infos.append(info)
+        return infos
+
+
+def work(
+    connection: Connection,
+    blocks: Dict[str, shared_memory.SharedMemory],
+    num_envs: int,
+    start: int,
+    stop: int,
+    floor_reward: float,
+) -> None:
+    """Run a shard in a worker process until told to close."""
+    shard = Shard(shared_buffers(blocks, num_envs), start, stop, floor_reward)
+    while True:
+        command, argument = connection.recv()
+        if command == "close":
+            break
+        try:
+            if command == "reset":
+                shard.reset(argument)
+                connection.send(None)
+            elif command == "step":
+                connection.send(shard.step())
+        except Exception:
+            connection.send(RuntimeError(traceback.format_exc()))
+    connection.close()
+
+
+class VectorEnv:
+    """
+    A batch of `num_envs` games, see `GameEnv`, stepped with one action each.
+
+    The observations of the whole batch are kept in one (num_envs,
+    len(LAYERS), width, height) buffer, which every step updates in place.
+    A game which ends starts again by itself.
+
+    With `workers` the games are split between that many processes.  The
+    buffers are then in shared memory, so the observations are never copied
+    between processes, only the commands and the small info dicts are sent.
+    """
+
+    def __init__(self, num_envs: int, workers: int = 0, floor_reward: float = 10.0):
+        self.num_envs = num_envs
+        self.blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.connections: List[Connection] = []
+        self.processes: List[multiprocessing.Process] = []
+        if not workers:
+            self.buffers = Buffers(**{
+                name: np.zeros(shape, dtype=dtype)
+                for name, (shape, dtype) in buffer_specs(num_envs).items()
+            })
+            self.shard: Optional[Shard] = Shard(self.buffers, 0, num_envs, floor_reward)
+            return
+
+        self.shard = None
+        for name, (shape, dtype) in buffer_specs(num_envs).items():
+            self.blocks[name] = shared_memory.SharedMemory(
+                create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self.buffers = shared_buffers(self.blocks, num_envs)
+        workers = min(workers, num_envs)
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int).tolist()
+        for start, stop in zip(bounds, bounds[1:]):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=work,
+                args=(child, self.blocks, num_envs, start, stop, floor_reward),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def call(self, command: str, argument: Any = None) -> List[Any]:
+        """Send a command to every worker and return their answers."""
+        for connection in self.connections:
+            connection.send((command, argument))
+        results = [connection.recv() for connection in self.connections]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def reset(self, seed: Optional[int] = None) -> np.ndarray:
+        """Start every game again and return the observations."""
+        if self.shard is not None:
+            self.shard.reset(seed)
+        else:
+            self.call("reset", seed)
+        return self.buffers.observations
+
+    def step(
+        self, actions: Sequence[int],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """Perform an action in each game, returns (observations, rewards, dones, infos).
+
+        The arrays returned are the batch's buffers, copy them to keep them.
+        """
+        self.buffers.actions[:] = actions
+        if self.shard is not None:
+            infos = self.shard.step()
+        else:
+            infos = [info for shard in self.call("step") for info in shard]
+        return self.buffers.observations, self.buffers.rewards, self.buffers.dones, infos
+
+    def close(self) -> None:
+        """Stop the workers and free the shared memory."""
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections, self.processes = [], []
+        if self.blocks:
+            del self.buffers  # Arrays over shared memory keep it from closing.
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self) -> VectorEnv:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()